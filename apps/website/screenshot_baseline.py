@@ -0,0 +1,305 @@
+"""
+Screenshot baseline store and comparison for verify_changes.py.
+
+Each route's full-page screenshot is compared with the stored baseline in
+stages, cheapest first. Only stages that prove pixel equality can skip the
+pixel diff:
+
+1. sha256 of the PNG bytes: identical renders are skipped without decoding.
+2. sha256 of the raw pixels of every 256px tile (cached in the baseline
+   index): pages whose tiles all match are skipped without decoding the
+   baseline, and otherwise only the tiles that differ are diffed.
+3. NumPy pixel diff: pixels whose channels differ by more than a tolerance,
+   outside the ignored regions, are grouped into changed regions, and a diff
+   image (baseline | current | highlighted changes) is written per region.
+
+An opt-in perceptual prefilter (DCT pHash per tile, phash_distance) can skip
+near-identical pages before stage 3. It is lossy: small edits, colour changes
+and short text changes can leave the hash unchanged.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+from PIL import Image
+
+TILE_SIZE = 256
+HASH_SAMPLE = 32  # tiles are downsampled to 32x32 before the DCT
+HASH_BITS = 8     # the 8x8 lowest frequencies (minus DC) form the hash
+REGION_CELL = 32  # changed pixels are grouped on a grid of 32px cells
+REGION_MARGIN = 16
+DEFAULT_TOLERANCE = 16
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+DCT = _dct_matrix(HASH_SAMPLE)
+
+
+def tile_hashes(image):
+    """pHash of every TILE_SIZE tile of an image, as a (rows, cols, 8) uint8 array.
+
+    The page is padded to whole tiles and downsampled in one resize, then the
+    2D DCT of all tiles is computed at once.
+    """
+    gray = image.convert("L")
+    cols = -(-gray.width // TILE_SIZE)
+    rows = -(-gray.height // TILE_SIZE)
+    canvas = Image.new("L", (cols * TILE_SIZE, rows * TILE_SIZE), 255)
+    canvas.paste(gray)
+    small = np.asarray(canvas.resize((cols * HASH_SAMPLE, rows * HASH_SAMPLE), Image.BOX),
+                       dtype=np.float64)
+    tiles = small.reshape(rows, HASH_SAMPLE, cols, HASH_SAMPLE).transpose(0, 2, 1, 3)
+    coeffs = DCT @ tiles @ DCT.T
+    low = coeffs[..., :HASH_BITS, :HASH_BITS].reshape(rows, cols, -1)[..., 1:]
+    bits = low > np.median(low, axis=-1, keepdims=True)
+    return np.packbits(bits, axis=-1)
+
+
+def tile_digests(pixels):
+    """sha256 of the raw RGB pixels of every TILE_SIZE tile, row by row."""
+    height, width = pixels.shape[:2]
+    return [
+        [hashlib.sha256(np.ascontiguousarray(pixels[y:y + TILE_SIZE, x:x + TILE_SIZE]).tobytes())
+         .hexdigest() for x in range(0, width, TILE_SIZE)]
+        for y in range(0, height, TILE_SIZE)
+    ]
+
+
+def encode_hashes(hashes):
+    return [[tile.tobytes().hex() for tile in row] for row in hashes]
+
+
+def decode_hashes(encoded):
+    return np.array([[np.frombuffer(bytes.fromhex(tile), dtype=np.uint8) for tile in row]
+                     for row in encoded], dtype=np.uint8)
+
+
+def hash_distances(a, b):
+    """Hamming distance of each tile hash."""
+    return np.unpackbits(a ^ b, axis=-1).sum(axis=-1)
+
+
+def changed_mask(baseline, current, tolerance, ignore=(), tiles=None):
+    """Boolean mask of changed pixels over the union of both image areas.
+
+    Pixels outside the overlap (the page grew or shrank) count as changed;
+    `ignore` is a list of (x, y, width, height) rectangles left out. When
+    `tiles` lists (row, col) tiles, only those are diffed; the other pixels
+    are known to be equal.
+    """
+    height = max(baseline.shape[0], current.shape[0])
+    width = max(baseline.shape[1], current.shape[1])
+    overlap_h = min(baseline.shape[0], current.shape[0])
+    overlap_w = min(baseline.shape[1], current.shape[1])
+
+    def diff(y0, y1, x0, x1):
+        delta = np.abs(baseline[y0:y1, x0:x1].astype(np.int16)
+                       - current[y0:y1, x0:x1].astype(np.int16))
+        return delta.max(axis=2) > tolerance
+
+    if tiles is None:
+        mask = np.ones((height, width), dtype=bool)
+        mask[:overlap_h, :overlap_w] = diff(0, overlap_h, 0, overlap_w)
+    else:
+        mask = np.zeros((height, width), dtype=bool)
+        for row, col in tiles:
+            y, x = row * TILE_SIZE, col * TILE_SIZE
+            mask[y:y + TILE_SIZE, x:x + TILE_SIZE] = diff(y, y + TILE_SIZE, x, x + TILE_SIZE)
+    for x, y, w, h in ignore:
+        mask[y:y + h, x:x + w] = False
+    return mask
+
+
+def changed_regions(mask, min_pixels=1):
+    """Bounding boxes (x, y, width, height, changed_pixels) of the changed areas.
+
+    The mask is reduced to a grid of REGION_CELL cells; cells with at least
+    `min_pixels` changed pixels are joined into regions by 8-connectivity.
+    """
+    height, width = mask.shape
+    rows = -(-height // REGION_CELL)
+    cols = -(-width // REGION_CELL)
+    padded = np.zeros((rows * REGION_CELL, cols * REGION_CELL), dtype=bool)
+    padded[:height, :width] = mask
+    counts = padded.reshape(rows, REGION_CELL, cols, REGION_CELL).sum(axis=(1, 3))
+    active = counts >= min_pixels
+
+    seen = np.zeros_like(active)
+    regions = []
+    for start in map(tuple, np.argwhere(active).tolist()):
+        if seen[start]:
+            continue
+        seen[start] = True
+        stack = [start]
+        top, left, bottom, right = start[0], start[1], start[0], start[1]
+        while stack:
+            r, c = stack.pop()
+            top, bottom = min(top, r), max(bottom, r)
+            left, right = min(left, c), max(right, c)
+            for nr in range(max(r - 1, 0), min(r + 2, rows)):
+                for nc in range(max(c - 1, 0), min(c + 2, cols)):
+                    if active[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        stack.append((nr, nc))
+        y, x = top * REGION_CELL, left * REGION_CELL
+        h = min((bottom + 1) * REGION_CELL, height) - y
+        w = min((right + 1) * REGION_CELL, width) - x
+        regions.append((x, y, w, h, int(mask[y:y + h, x:x + w].sum())))
+    return regions
+
+
+def _crop(pixels, x, y, w, h):
+    """Crop with white fill where the box lies outside the image."""
+    out = np.full((h, w, 3), 255, dtype=np.uint8)
+    part = pixels[y:y + h, x:x + w]
+    out[:part.shape[0], :part.shape[1]] = part
+    return out
+
+
+def write_region_diff(path, baseline, current, mask, region):
+    """Save baseline | current | current with changed pixels in red, for one region."""
+    x, y, w, h, _ = region
+    x0, y0 = max(x - REGION_MARGIN, 0), max(y - REGION_MARGIN, 0)
+    x1 = min(x + w + REGION_MARGIN, mask.shape[1])
+    y1 = min(y + h + REGION_MARGIN, mask.shape[0])
+    w, h = x1 - x0, y1 - y0
+
+    before = _crop(baseline, x0, y0, w, h)
+    after = _crop(current, x0, y0, w, h)
+    highlight = (after * 0.4 + 153).astype(np.uint8)
+    highlight[mask[y0:y1, x0:x1]] = (255, 0, 0)
+    separator = np.zeros((h, 4, 3), dtype=np.uint8)
+    Image.fromarray(np.hstack([before, separator, after, separator, highlight])).save(path)
+
+
+class BaselineStore:
+    """Baseline screenshots (<directory>/<name>.png) and their fingerprints.
+
+    index.json keeps, per name, the sha256 of the PNG bytes, the image size,
+    the per-tile pixel digests and perceptual hashes, so the hash stages never
+    decode the baseline image.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                self.index = json.load(f)
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.png")
+
+    def save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def update(self, name, png_path, data=None, image=None):
+        """Make a screenshot the new baseline for `name`."""
+        if data is None:
+            with open(png_path, "rb") as f:
+                data = f.read()
+        if image is None:
+            image = Image.open(io.BytesIO(data)).convert("RGB")
+        entry = {
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "size": [image.width, image.height],
+            "tile_sha256": tile_digests(np.asarray(image)),
+            "tile_hashes": encode_hashes(tile_hashes(image)),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        shutil.copyfile(png_path, self.path(name))
+        with self.lock:
+            self.index[name] = entry
+            self.save_index()
+
+    def compare(self, name, png_path, diff_dir, tolerance=DEFAULT_TOLERANCE,
+                phash_distance=None, ignore=(), min_pixels=1):
+        """Compare a screenshot with the baseline of `name`.
+
+        Returns a dict with "status" (new, unchanged or changed), the "stage"
+        that decided it and, for changed pages, the changed "regions" and their
+        "diff_images". A missing baseline is created from the screenshot.
+        phash_distance enables the lossy perceptual prefilter: the largest tile
+        hash distance still considered unchanged (None, the default, skips it).
+        """
+        with open(png_path, "rb") as f:
+            data = f.read()
+        # Diff images of a previous run would no longer match this comparison
+        if os.path.isdir(diff_dir):
+            for old in os.listdir(diff_dir):
+                if re.fullmatch(rf"{re.escape(name)}_region\d+\.png", old):
+                    os.remove(os.path.join(diff_dir, old))
+        entry = self.index.get(name)
+        if entry is None or not os.path.exists(self.path(name)):
+            self.update(name, png_path, data)
+            return {"status": "new", "stage": None, "baseline": self.path(name)}
+
+        result = {"baseline": self.path(name)}
+        if hashlib.sha256(data).hexdigest() == entry["sha256"]:
+            return {**result, "status": "unchanged", "stage": "sha256"}
+
+        image = Image.open(io.BytesIO(data)).convert("RGB")
+        current = np.asarray(image)
+        same_size = [image.width, image.height] == entry["size"]
+        if phash_distance is not None and same_size:
+            distances = hash_distances(tile_hashes(image), decode_hashes(entry["tile_hashes"]))
+            if distances.max() <= phash_distance:
+                return {**result, "status": "unchanged", "stage": "phash"}
+
+        tiles = None
+        if same_size and "tile_sha256" in entry:
+            tiles = [
+                (row, col)
+                for row, (digests, baseline_digests) in enumerate(
+                    zip(tile_digests(current), entry["tile_sha256"]))
+                for col, (digest, baseline_digest) in enumerate(zip(digests, baseline_digests))
+                if digest != baseline_digest
+            ]
+            if not tiles:
+                return {**result, "status": "unchanged", "stage": "tiles"}
+
+        baseline = np.asarray(Image.open(self.path(name)).convert("RGB"))
+        mask = changed_mask(baseline, current, tolerance, ignore, tiles)
+        regions = changed_regions(mask, min_pixels)
+        if not regions:
+            return {**result, "status": "unchanged", "stage": "pixels"}
+
+        os.makedirs(diff_dir, exist_ok=True)
+        diff_images = []
+        for i, region in enumerate(regions, 1):
+            path = os.path.join(diff_dir, f"{name}_region{i}.png")
+            write_region_diff(path, baseline, current, mask, region)
+            diff_images.append(path)
+        return {
+            **result,
+            "status": "changed",
+            "stage": "pixels",
+            "size": [image.width, image.height],
+            "baseline_size": entry["size"],
+            "changed_pixels": int(mask.sum()),
+            "regions": [
+                {"x": x, "y": y, "width": w, "height": h, "changed_pixels": n}
+                for x, y, w, h, n in regions
+            ],
+            "diff_images": diff_images,
+        }
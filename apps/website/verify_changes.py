@@ -1,50 +1,390 @@
-from playwright.sync_api import sync_playwright
+"""
+Parallel page verification and performance capture for the website.
 
-def verify_changes():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        # Use a large viewport to see the desktop layout
-        context = browser.new_context(viewport={"width": 1920, "height": 1080})
-        page = context.new_page()
+Visits a list of routes on a locally served build (``pnpm build && pnpm
+start``), each in its own browser context with several running at once. For
+every route it takes a full-page screenshot and records navigation timing,
+FCP/LCP/CLS, JS heap size and transferred bytes. Results are written to a JSON
+report and checked against thresholds; the exit code is non-zero when a route
+fails to load or exceeds one of them.
+
+Screenshots are compared with a baseline store (see screenshot_baseline.py):
+pixel-identical pages are skipped by hash, and changed ones get diff images of the
+regions that changed. A changed page fails the run until the baseline is
+accepted with --update-baseline.
+
+    python verify_changes.py --routes / /operations --concurrency 4 --runs 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from playwright.async_api import async_playwright
+
+from screenshot_baseline import DEFAULT_TOLERANCE, BaselineStore
+
+BASE_URL = "http://localhost:3000"
+OUTPUT_DIR = "/home/jules/verification"
+DEFAULT_ROUTES = ["/", "/operations"]
+# Use a large viewport to see the desktop layout
+VIEWPORT = {"width": 1920, "height": 1080}
+
+# Per-route limits. LCP, CLS and FCP use the targets from
+# PERFORMANCE_OPTIMIZATION_REPORT.md; the others are regression guards.
+DEFAULT_THRESHOLDS = {
+    "ttfb_ms": 800,
+    "fcp_ms": 1800,
+    "lcp_ms": 2500,
+    "cls": 0.1,
+    "dom_content_loaded_ms": 3000,
+    "load_ms": 5000,
+    "js_heap_bytes": 50 * 1024 * 1024,
+    "transferred_bytes": 2 * 1024 * 1024,
+}
+
+# Installed in every context before any page script runs, so buffered LCP and
+# layout-shift entries are observed from the start of the navigation. CLS uses
+# session windows (shifts less than 1s apart, windows capped at 5s).
+OBSERVERS_SCRIPT = """
+(() => {
+    const perf = { lcp: null, cls: 0 };
+    window.__perfMetrics = perf;
+    let sessionValue = 0;
+    let sessionStart = 0;
+    let lastShift = 0;
+    try {
+        new PerformanceObserver((list) => {
+            for (const entry of list.getEntries()) perf.lcp = entry.startTime;
+        }).observe({ type: "largest-contentful-paint", buffered: true });
+        new PerformanceObserver((list) => {
+            for (const entry of list.getEntries()) {
+                if (entry.hadRecentInput) continue;
+                if (sessionValue && (entry.startTime - lastShift > 1000
+                        || entry.startTime - sessionStart > 5000)) {
+                    sessionValue = 0;
+                }
+                if (!sessionValue) sessionStart = entry.startTime;
+                sessionValue += entry.value;
+                lastShift = entry.startTime;
+                perf.cls = Math.max(perf.cls, sessionValue);
+            }
+        }).observe({ type: "layout-shift", buffered: true });
+    } catch (e) {
+        // Entry types not supported by this browser
+    }
+})();
+"""
+
+# Navigation timestamps are relative to the start of the navigation
+COLLECT_SCRIPT = """
+() => {
+    const nav = performance.getEntriesByType("navigation")[0];
+    const fcp = performance.getEntriesByName("first-contentful-paint")[0];
+    const perf = window.__perfMetrics || {};
+    return {
+        ttfb_ms: nav ? nav.responseStart : null,
+        dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : null,
+        load_ms: nav ? nav.loadEventEnd : null,
+        document_bytes: nav ? nav.transferSize : null,
+        fcp_ms: fcp ? fcp.startTime : null,
+        lcp_ms: perf.lcp ?? null,
+        cls: perf.cls ?? null,
+    };
+}
+"""
+
+
+def route_slug(route):
+    """File-name friendly name of a route: "/" -> "home", "/fr/a-b" -> "fr_a-b"."""
+    return re.sub(r"[^A-Za-z0-9-]+", "_", route.strip("/")) or "home"
+
+
+def load_routes(routes, routes_file):
+    if not routes_file:
+        return routes
+    with open(routes_file, encoding="utf-8") as f:
+        lines = [line.split("#", 1)[0].strip() for line in f]
+    return [line for line in lines if line]
+
+
+def load_thresholds(path):
+    """Thresholds file: {"default": {...}, "routes": {"/operations": {...}}}.
+
+    Values are merged over DEFAULT_THRESHOLDS; null disables a check.
+    """
+    thresholds = {"default": dict(DEFAULT_THRESHOLDS), "routes": {}}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            overrides = json.load(f)
+        thresholds["default"].update(overrides.get("default", {}))
+        thresholds["routes"] = overrides.get("routes", {})
+    return thresholds
+
+
+def route_thresholds(thresholds, route):
+    return {**thresholds["default"], **thresholds["routes"].get(route, {})}
+
+
+def check_thresholds(metrics, limits):
+    violations = []
+    for name, limit in limits.items():
+        value = metrics.get(name)
+        if limit is not None and value is not None and value > limit:
+            violations.append({"metric": name, "value": value, "threshold": limit})
+    return violations
+
+
+def median_metrics(runs):
+    """Median of each metric over the successful runs of a route."""
+    names = sorted({name for run in runs for name in run})
+    medians = {}
+    for name in names:
+        values = [run[name] for run in runs if run.get(name) is not None]
+        medians[name] = statistics.median(values) if values else None
+    return medians
+
+
+async def measure_route(browser, base_url, route, output_dir, screenshot=True):
+    """Load one route in a fresh (cold cache) context and collect its metrics."""
+    context = await browser.new_context(viewport=VIEWPORT)
+    await context.add_init_script(OBSERVERS_SCRIPT)
+    page = await context.new_page()
+
+    # Heap size and encoded bytes on the wire come from the DevTools protocol
+    cdp = await context.new_cdp_session(page)
+    network = {"bytes": 0, "requests": 0}
+
+    def on_loading_finished(event):
+        network["bytes"] += event.get("encodedDataLength", 0)
+        network["requests"] += 1
+
+    cdp.on("Network.loadingFinished", on_loading_finished)
+    await cdp.send("Network.enable")
+    await cdp.send("Performance.enable")
+
+    url = base_url.rstrip("/") + route
+    result = {"route": route, "url": url}
+    try:
+        response = await page.goto(url)
+        await page.wait_for_load_state("networkidle")
+        result["status"] = response.status if response else None
+        if response and not response.ok:
+            raise RuntimeError(f"HTTP {response.status}")
+
+        metrics = await page.evaluate(COLLECT_SCRIPT)
+        performance = await cdp.send("Performance.getMetrics")
+        heap = {m["name"]: m["value"] for m in performance["metrics"]}
+        metrics["js_heap_bytes"] = heap.get("JSHeapUsedSize")
+        metrics["transferred_bytes"] = network["bytes"]
+        metrics["requests"] = network["requests"]
+        result["metrics"] = metrics
+
+        if screenshot:
+            path = os.path.join(output_dir, f"{route_slug(route)}.png")
+            await page.screenshot(path=path, full_page=True)
+            result["screenshot"] = path
+    except Exception as e:
+        result["error"] = str(e)
+        path = os.path.join(output_dir, f"{route_slug(route)}_error.png")
+        try:
+            await page.screenshot(path=path)
+            result["screenshot"] = path
+        except Exception:
+            pass
+    finally:
+        await context.close()
+    return result
+
+
+async def measure_routes(routes, base_url, concurrency, runs, output_dir):
+    """Measure every route `runs` times, at most `concurrency` contexts at once."""
+    semaphore = asyncio.Semaphore(concurrency)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+
+        async def job(route, run):
+            async with semaphore:
+                print(f"Measuring {route} (run {run + 1}/{runs})...")
+                # Only the first run of a route takes the screenshot
+                return await measure_route(browser, base_url, route, output_dir,
+                                           screenshot=run == 0)
 
         try:
-            # Navigate to the home page
-            print("Navigating to home page...")
-            page.goto("http://localhost:3000")
-            page.wait_for_load_state("networkidle")
-
-            # Screenshot of Hero Section (Gradient, CTAs, Text move)
-            print("Taking screenshot of Hero Section...")
-            page.screenshot(path="/home/jules/verification/home_hero.png", clip={"x": 0, "y": 0, "width": 1920, "height": 800})
-
-            # Use specific selectors for sections, avoiding text based locators that might change
-            # KPI Band
-            print("Taking screenshot of KPI Band...")
-            # We look for the section following the hero. The hero is the first section.
-            # Or better, we look for the section containing the counters.
-            # Since we updated KPIBand to use Counter component, we can look for "counter-container" class?
-            # Or just scroll down bit by bit.
-
-            # Just take a full page screenshot to see everything
-            page.screenshot(path="/home/jules/verification/full_page.png", full_page=True)
-            print("Full page screenshot taken.")
-
-
-            # Navigate to Operations Page
-            print("Navigating to Operations page...")
-            page.goto("http://localhost:3000/operations")
-            page.wait_for_load_state("networkidle")
-
-            # Screenshot of Operations Page (Header, Filter, Grid)
-            print("Taking screenshot of Operations Page...")
-            page.screenshot(path="/home/jules/verification/operations_page.png", full_page=True)
-
-        except Exception as e:
-            print(f"Error during verification: {e}")
-            page.screenshot(path="/home/jules/verification/error.png")
-            raise e
+            return await asyncio.gather(*(
+                job(route, run) for route in routes for run in range(runs)
+            ))
         finally:
-            browser.close()
+            await browser.close()
+
+
+def build_report(results, routes, base_url, concurrency, runs, thresholds):
+    entries = []
+    for route in routes:
+        route_results = [r for r in results if r["route"] == route]
+        ok = [r["metrics"] for r in route_results if "metrics" in r]
+        errors = [r["error"] for r in route_results if "error" in r]
+        metrics = median_metrics(ok) if ok else {}
+        limits = route_thresholds(thresholds, route)
+        entry = {
+            "route": route,
+            "url": route_results[0]["url"],
+            "status": next((r.get("status") for r in route_results if "status" in r), None),
+            "runs": len(ok),
+            "metrics": metrics,
+            "thresholds": limits,
+            "violations": check_thresholds(metrics, limits),
+            "errors": errors,
+            "screenshot": next((r["screenshot"] for r in route_results if "screenshot" in r), None),
+        }
+        entry["passed"] = bool(ok) and not errors and not entry["violations"]
+        entries.append(entry)
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "runs": runs,
+        "routes": entries,
+        "passed": all(entry["passed"] for entry in entries),
+    }
+
+
+def print_report(report):
+    for entry in report["routes"]:
+        m = entry["metrics"]
+        status = "PASS" if entry["passed"] else "FAIL"
+        if m:
+            print(f"{status} {entry['route']}: LCP {m.get('lcp_ms')} ms, CLS {m.get('cls')}, "
+                  f"FCP {m.get('fcp_ms')} ms, heap {m.get('js_heap_bytes')} B, "
+                  f"transferred {m.get('transferred_bytes')} B")
+        else:
+            print(f"{status} {entry['route']}: no successful run")
+        for v in entry["violations"]:
+            print(f"    {v['metric']} = {v['value']} exceeds {v['threshold']}")
+        for error in entry["errors"]:
+            print(f"    Error: {error}")
+        visual = entry.get("visual")
+        if visual:
+            stage = f" ({visual['stage']})" if visual["stage"] else ""
+            print(f"    Screenshot: {visual['status']}{stage}")
+            for path in visual.get("diff_images", []):
+                print(f"    Diff: {path}")
+
+
+def load_ignore_regions(path):
+    """Ignore regions file: {"/": [[x, y, width, height], ...]} (dynamic content)."""
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_screenshots(report, store, diff_dir, update_baseline=False, workers=4, **options):
+    """Compare each route's screenshot with its baseline, in parallel.
+
+    Adds a "visual" result to every report entry; changed pages fail the entry
+    unless the baseline is being updated. `options` go to BaselineStore.compare.
+    """
+    ignore_regions = options.pop("ignore_regions", {})
+    entries = [e for e in report["routes"] if e["screenshot"] and not e["errors"]]
+
+    def compare(entry):
+        name = route_slug(entry["route"])
+        visual = store.compare(name, entry["screenshot"], diff_dir,
+                               ignore=ignore_regions.get(entry["route"], ()), **options)
+        if visual["status"] == "changed" and update_baseline:
+            store.update(name, entry["screenshot"])
+            visual["status"] = "updated"
+        return entry, visual
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for entry, visual in pool.map(compare, entries):
+            entry["visual"] = visual
+            if visual["status"] == "changed":
+                entry["passed"] = False
+    report["passed"] = all(entry["passed"] for entry in report["routes"])
+
+
+def verify_changes(routes=DEFAULT_ROUTES, base_url=BASE_URL, concurrency=4, runs=1,
+                   output_dir=OUTPUT_DIR, thresholds=None, report_path=None,
+                   baseline_dir=None, update_baseline=False, tolerance=DEFAULT_TOLERANCE,
+                   phash_distance=None, ignore_regions=None):
+    """Measure and screenshot the routes, compare them with the baselines,
+    write the JSON report and return it. baseline_dir=False skips the
+    visual comparison.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    thresholds = thresholds or load_thresholds(None)
+    results = asyncio.run(measure_routes(routes, base_url, concurrency, runs, output_dir))
+    report = build_report(results, routes, base_url, concurrency, runs, thresholds)
+
+    if baseline_dir is not False:
+        store = BaselineStore(baseline_dir or os.path.join(output_dir, "baseline"))
+        compare_screenshots(report, store, os.path.join(output_dir, "diffs"),
+                            update_baseline=update_baseline, workers=concurrency,
+                            tolerance=tolerance, phash_distance=phash_distance,
+                            ignore_regions=ignore_regions or {})
+
+    report_path = report_path or os.path.join(output_dir, "perf_report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"Report written to {report_path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--routes", nargs="+", default=DEFAULT_ROUTES)
+    parser.add_argument("--routes-file", help="one route per line (overrides --routes)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="browser contexts measured at once; timings get noisier as "
+                             "this approaches the number of CPUs")
+    parser.add_argument("--runs", type=int, default=1,
+                        help="loads per route; the report keeps the median of each metric")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--thresholds", help="JSON file overriding DEFAULT_THRESHOLDS")
+    parser.add_argument("--report", help="report path (default: <output-dir>/perf_report.json)")
+    parser.add_argument("--baseline-dir",
+                        help="baseline screenshots (default: <output-dir>/baseline)")
+    parser.add_argument("--no-baseline", action="store_true",
+                        help="skip the screenshot comparison")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="accept changed screenshots as the new baselines")
+    parser.add_argument("--tolerance", type=int, default=DEFAULT_TOLERANCE,
+                        help="per-channel difference (0-255) still treated as unchanged")
+    parser.add_argument("--phash-distance", type=int, default=None,
+                        help="enable the perceptual prefilter: tile hash distance (bits) "
+                             "still treated as unchanged. Lossy: it can miss small edits, "
+                             "colour changes and short text changes (default: off)")
+    parser.add_argument("--ignore-regions", help="JSON file of regions to ignore per route")
+    args = parser.parse_args()
+
+    report = verify_changes(
+        routes=load_routes(args.routes, args.routes_file),
+        base_url=args.base_url,
+        concurrency=args.concurrency,
+        runs=args.runs,
+        output_dir=args.output_dir,
+        thresholds=load_thresholds(args.thresholds),
+        report_path=args.report,
+        baseline_dir=False if args.no_baseline else args.baseline_dir,
+        update_baseline=args.update_baseline,
+        tolerance=args.tolerance,
+        phash_distance=args.phash_distance,
+        ignore_regions=load_ignore_regions(args.ignore_regions),
+    )
+    return 0 if report["passed"] else 1
+
 
 if __name__ == "__main__":
-    verify_changes()
+    sys.exit(main())
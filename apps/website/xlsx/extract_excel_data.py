@@ -4,27 +4,226 @@ Extract data and formulas from Excel files for Alecia Colab Sheets implementatio
 """
 
 import os
+import io
 import json
 import csv
+import hashlib
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, time
+from xml.etree.ElementTree import iterparse
+import numpy as np
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.xml.constants import SHEET_MAIN_NS
 
 XLSX_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(XLSX_DIR, 'csv_exports')
+SUMMARY_PATH = os.path.join(OUTPUT_DIR, 'workbooks_summary.json')
+# Content hashes of the extracted workbooks (and of this script), used to
+# skip workbooks that have not changed since the last run
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, 'manifest.json')
+
+MERGE_CELL_TAG = f'{{{SHEET_MAIN_NS}}}mergeCell'
+
+# Typed export: one structured .npy array per sheet, one field per column
+# (named by column letter). Blanks are NaN / NaT / -1 (booleans). String
+# columns hold (offset, length) references into the sheet's UTF-8 buffer
+# (<sheet>.strings.npy), length 0 for blanks. Mixed columns are stored as
+# strings, plus a typed '<letter>_<kind>' field for each non-string kind
+# they contain (e.g. 'C_number').
+NUMPY_DTYPES = {
+    'empty': 'f8',
+    'number': 'f8',
+    'boolean': 'i1',
+    'datetime': 'M8[s]',
+}
+STRING_REF = np.dtype([('offset', '<u8'), ('length', '<u4')])
+BLANKS = {
+    'empty': np.nan,
+    'number': np.nan,
+    'boolean': -1,
+    'datetime': np.datetime64('NaT'),
+    'string': (0, 0),
+}
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def csv_filename(filename, sheet_name):
+    return f"{os.path.splitext(filename)[0]}_{sheet_name.replace(' ', '_')}.csv"
+
+def npy_filename(filename, sheet_name):
+    return f"{os.path.splitext(filename)[0]}_{sheet_name.replace(' ', '_')}.npy"
+
+def strings_filename(npy_name):
+    return f"{os.path.splitext(npy_name)[0]}.strings.npy"
+
+def export_filenames(filename, sheet_name):
+    npy_name = npy_filename(filename, sheet_name)
+    return [csv_filename(filename, sheet_name), npy_name, strings_filename(npy_name)]
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def read_merged_cells(ws):
+    """Stream <mergeCell> refs out of a read-only worksheet's XML part.
+
+    Refs are kept in document order, so the summary is stable across runs.
+    """
+    refs = []
+    with ws._get_source() as source:
+        for _, element in iterparse(source):
+            if element.tag == MERGE_CELL_TAG:
+                refs.append(str(CellRange(element.get('ref'))))
+            element.clear()
+    return refs
+
+def measure_sheet(ws, merged_cells):
+    """(max_row, max_col, dimensions) of a read-only worksheet, from its cells.
+
+    Read-only mode trusts the sheet's <dimension> tag, which some writers
+    leave stale (e.g. "A1"), so the stored size is dropped and the rows are
+    scanned instead. Merged ranges count too, as they do in a full load.
+    """
+    ws.reset_dimensions()
+    max_row = max_col = 1
+    for cells in ws.rows:
+        if cells:
+            max_row = max(max_row, cells[-1].row)
+            max_col = max(max_col, cells[-1].column)
+    for ref in merged_cells:
+        merged = CellRange(ref)
+        max_row = max(max_row, merged.max_row)
+        max_col = max(max_col, merged.max_col)
+    dimensions = (f"{get_column_letter(ws.min_column)}{ws.min_row}:"
+                  f"{get_column_letter(max_col)}{max_row}")
+    return max_row, max_col, dimensions
+
+def value_kind(value):
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, (datetime, date)):
+        return 'datetime'
+    return 'string'
+
+def column_type(kinds):
+    """'empty', a single kind, or 'mixed' when a column holds several kinds."""
+    if not kinds:
+        return 'empty'
+    return next(iter(kinds)) if len(kinds) == 1 else 'mixed'
+
+def typed_value(value, kind):
+    """A cell value as stored in a field of `kind` (other kinds become blanks)."""
+    if value is None or value_kind(value) != kind:
+        return BLANKS[kind]
+    if kind == 'boolean':
+        return int(value)
+    if kind == 'datetime':
+        if not isinstance(value, datetime):
+            value = datetime.combine(value, time())
+        return np.datetime64(value, 's')
+    return value
+
+def allocate(path, dtype, length):
+    """Preallocated .npy file opened as a writable memmap (None when empty)."""
+    if length == 0:
+        np.save(path, np.empty(0, dtype=dtype))
+        return None
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(length,))
+
+def write_typed_export(path, ws_values, max_row, max_col, kinds, text_bytes):
+    """Write a sheet's typed export in a second streaming pass over its values.
+
+    `kinds` (column letter -> set of value kinds) and `text_bytes` (column
+    letter -> total UTF-8 size of its stringified values) come from the first
+    pass, so both files are preallocated and filled row by row.
+    """
+    fields = []
+    plan = []  # (column index, field kind) per field
+    offsets = {}  # column index -> next free byte of its segment of the buffer
+    buffer_size = 0
+    for i, (letter, column_kinds) in enumerate(kinds.items()):
+        data_type = column_type(column_kinds)
+        if data_type in ('string', 'mixed'):
+            fields.append((letter, STRING_REF))
+            plan.append((i, 'string'))
+            offsets[i] = buffer_size
+            buffer_size += text_bytes[letter]
+            extra = sorted(column_kinds - {'string'}) if data_type == 'mixed' else []
+            for kind in extra:
+                fields.append((f'{letter}_{kind}', NUMPY_DTYPES[kind]))
+                plan.append((i, kind))
+        else:
+            fields.append((letter, NUMPY_DTYPES[data_type]))
+            plan.append((i, data_type))
+
+    table = allocate(path, np.dtype(fields), max_row)
+    strings = allocate(strings_filename(path), np.uint8, buffer_size)
+    if table is None:
+        return
+
+    rows = ws_values.iter_rows(min_row=1, max_row=max_row, min_col=1,
+                               max_col=max_col, values_only=True)
+    for r, value_row in enumerate(rows):
+        record = []
+        for i, kind in plan:
+            value = value_row[i]
+            if kind != 'string':
+                record.append(typed_value(value, kind))
+            elif value is None:
+                record.append(BLANKS['string'])
+            else:
+                data = str(value).encode('utf-8')
+                start = offsets[i]
+                strings[start:start + len(data)] = np.frombuffer(data, dtype=np.uint8)
+                offsets[i] = start + len(data)
+                record.append((start, len(data)))
+        table[r] = tuple(record)
+
+    table.flush()
+    if strings is not None:
+        strings.flush()
+
+def load_typed_export(path):
+    """Memory-map a typed export: (table, strings). Columns are table['B'] etc."""
+    return np.load(path, mmap_mode='r'), np.load(strings_filename(path), mmap_mode='r')
+
+def column_text(table, strings, letter):
+    """Decode the strings of a string (or mixed) column; blanks become ''."""
+    return [bytes(strings[offset:offset + length]).decode('utf-8')
+            for offset, length in table[letter].tolist()]
+
 def extract_workbook_info(filepath):
-    """Extract all data and formulas from a workbook."""
+    """Extract all data and formulas from a workbook.
+
+    Both views of the workbook (formulas and cached values) are opened in
+    read-only mode and their rows are zipped in a single pass, so memory is
+    bounded by the row width rather than the sheet size. CSV rows are written
+    as they are read; the typed export needs every column's type first, so it
+    is written by a second read-only pass into preallocated files.
+    """
     filename = os.path.basename(filepath)
     print(f"\n{'='*60}")
     print(f"Processing: {filename}")
     print('='*60)
 
-    # Load workbook with data_only=False to get formulas
-    wb_formulas = load_workbook(filepath, data_only=False)
-    # Load again with data_only=True to get computed values
-    wb_values = load_workbook(filepath, data_only=True)
+    # Formulas and computed values come from two read-only views of the file
+    wb_formulas = load_workbook(filepath, read_only=True, data_only=False)
+    wb_values = load_workbook(filepath, read_only=True, data_only=True)
 
     workbook_info = {
         'filename': filename,
@@ -35,58 +234,77 @@ def extract_workbook_info(filepath):
         ws_formulas = wb_formulas[sheet_name]
         ws_values = wb_values[sheet_name]
 
+        merged_cells = read_merged_cells(ws_formulas)
+        max_row, max_col, dimensions = measure_sheet(ws_formulas, merged_cells)
+
         print(f"\n  Sheet: {sheet_name}")
-        print(f"  Dimensions: {ws_formulas.dimensions}")
+        print(f"  Dimensions: {dimensions}")
 
         sheet_info = {
             'name': sheet_name,
-            'dimensions': ws_formulas.dimensions,
-            'max_row': ws_formulas.max_row,
-            'max_col': ws_formulas.max_column,
+            'dimensions': dimensions,
+            'max_row': max_row,
+            'max_col': max_col,
             'formulas': [],
             'headers': [],
             'data_types': {},
-            'merged_cells': [str(m) for m in ws_formulas.merged_cells.ranges]
+            'merged_cells': merged_cells
         }
 
-        # Extract headers (first row)
-        for col in range(1, ws_formulas.max_column + 1):
-            cell = ws_formulas.cell(row=1, column=col)
-            if cell.value:
-                sheet_info['headers'].append({
-                    'column': get_column_letter(col),
-                    'value': str(cell.value)
-                })
+        csv_name = csv_filename(filename, sheet_name)
+        csv_path = os.path.join(OUTPUT_DIR, csv_name)
+        npy_name = npy_filename(filename, sheet_name)
+        letters = [get_column_letter(col) for col in range(1, max_col + 1)]
+        kinds = {letter: set() for letter in letters}
+        text_bytes = dict.fromkeys(letters, 0)
+
+        rows = zip(
+            ws_formulas.iter_rows(min_row=1, max_row=max_row, min_col=1,
+                                  max_col=max_col, values_only=True),
+            ws_values.iter_rows(min_row=1, max_row=max_row, min_col=1,
+                                max_col=max_col, values_only=True),
+        )
 
-        # Extract formulas
         formula_count = 0
-        for row in range(1, ws_formulas.max_row + 1):
-            for col in range(1, ws_formulas.max_column + 1):
-                cell = ws_formulas.cell(row=row, column=col)
-                if cell.value and isinstance(cell.value, str) and cell.value.startswith('='):
-                    cell_ref = f"{get_column_letter(col)}{row}"
-                    value_cell = ws_values.cell(row=row, column=col)
-                    sheet_info['formulas'].append({
-                        'cell': cell_ref,
-                        'formula': cell.value,
-                        'computed_value': str(value_cell.value) if value_cell.value is not None else None
-                    })
-                    formula_count += 1
+        with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            for row, (formula_row, value_row) in enumerate(rows, 1):
+                # Extract headers (first row)
+                if row == 1:
+                    for col, value in enumerate(formula_row, 1):
+                        if value:
+                            sheet_info['headers'].append({
+                                'column': get_column_letter(col),
+                                'value': str(value)
+                            })
 
-        print(f"  Formulas found: {formula_count}")
-        print(f"  Merged cells: {len(sheet_info['merged_cells'])}")
+                # Extract formulas
+                for col, value in enumerate(formula_row, 1):
+                    if value and isinstance(value, str) and value.startswith('='):
+                        computed = value_row[col - 1]
+                        sheet_info['formulas'].append({
+                            'cell': f"{get_column_letter(col)}{row}",
+                            'formula': value,
+                            'computed_value': str(computed) if computed is not None else None
+                        })
+                        formula_count += 1
 
-        # Export to CSV
-        csv_filename = f"{os.path.splitext(filename)[0]}_{sheet_name.replace(' ', '_')}.csv"
-        csv_path = os.path.join(OUTPUT_DIR, csv_filename)
+                # Export to CSV
+                writer.writerow(value_row)
 
-        with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            for row in ws_values.iter_rows(min_row=1, max_row=ws_values.max_row,
-                                           min_col=1, max_col=ws_values.max_column):
-                writer.writerow([cell.value for cell in row])
+                for letter, value in zip(letters, value_row):
+                    if value is not None:
+                        kinds[letter].add(value_kind(value))
+                        text_bytes[letter] += len(str(value).encode('utf-8'))
 
-        print(f"  CSV exported: {csv_filename}")
+        sheet_info['data_types'] = {letter: column_type(kinds[letter]) for letter in letters}
+        write_typed_export(os.path.join(OUTPUT_DIR, npy_name), ws_values,
+                           max_row, max_col, kinds, text_bytes)
+
+        print(f"  Formulas found: {formula_count}")
+        print(f"  Merged cells: {len(sheet_info['merged_cells'])}")
+        print(f"  CSV exported: {csv_name}")
+        print(f"  Typed export: {npy_name}")
 
         workbook_info['sheets'].append(sheet_info)
 
@@ -95,24 +313,106 @@ def extract_workbook_info(filepath):
 
     return workbook_info
 
+def extract_with_log(filepath):
+    """Run extract_workbook_info in a worker, returning its console output too."""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        info = extract_workbook_info(filepath)
+    return info, log.getvalue()
+
+def is_up_to_date(filename, digest, manifest, previous):
+    """Whether a workbook's previous summary entry and exports can be reused."""
+    entry = manifest['workbooks'].get(filename)
+    if not entry or entry['sha256'] != digest or filename not in previous:
+        return False
+    return all(
+        os.path.exists(os.path.join(OUTPUT_DIR, name))
+        for sheet in previous[filename]['sheets']
+        for name in export_filenames(filename, sheet['name'])
+    )
+
 def main():
-    all_workbooks = []
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='extraction processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true',
+                        help='re-extract every workbook, ignoring the manifest')
+    args = parser.parse_args()
+
+    filenames = [
+        filename for filename in sorted(os.listdir(XLSX_DIR))
+        if filename.endswith('.xlsx') and not filename.startswith('~')
+    ]
+    hashes = {
+        filename: file_sha256(os.path.join(XLSX_DIR, filename))
+        for filename in filenames
+    }
+
+    # A change to this script invalidates every cached entry
+    extractor = file_sha256(os.path.abspath(__file__))
+    manifest = load_json(MANIFEST_PATH, {'extractor': None, 'workbooks': {}})
+    previous = {}
+    if not args.force and manifest.get('extractor') == extractor:
+        previous = {wb['filename']: wb for wb in load_json(SUMMARY_PATH, [])}
 
-    # Process all Excel files
-    for filename in sorted(os.listdir(XLSX_DIR)):
-        if filename.endswith('.xlsx') and not filename.startswith('~'):
-            filepath = os.path.join(XLSX_DIR, filename)
-            info = extract_workbook_info(filepath)
-            all_workbooks.append(info)
+    summaries = {}
+    pending = []
+    for filename in filenames:
+        if is_up_to_date(filename, hashes[filename], manifest, previous):
+            print(f"Unchanged: {filename} (reusing previous extraction)")
+            summaries[filename] = previous[filename]
+        else:
+            pending.append(filename)
+
+    # Process changed Excel files, in parallel when there are several
+    if len(pending) > 1 and args.workers != 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(extract_with_log, os.path.join(XLSX_DIR, filename)): filename
+                for filename in pending
+            }
+            for future in as_completed(futures):
+                info, log = future.result()
+                print(log, end='')
+                summaries[futures[future]] = info
+    else:
+        for filename in pending:
+            summaries[filename] = extract_workbook_info(os.path.join(XLSX_DIR, filename))
+
+    # Drop exports of workbooks that no longer exist
+    for filename, entry in manifest['workbooks'].items():
+        if filename not in hashes:
+            for name in entry.get('csv_files', []) + entry.get('npy_files', []):
+                path = os.path.join(OUTPUT_DIR, name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    all_workbooks = [summaries[filename] for filename in filenames]
 
     # Save summary JSON
-    summary_path = os.path.join(OUTPUT_DIR, 'workbooks_summary.json')
+    summary_path = SUMMARY_PATH
     with open(summary_path, 'w', encoding='utf-8') as f:
         json.dump(all_workbooks, f, indent=2, ensure_ascii=False)
 
+    manifest = {
+        'extractor': extractor,
+        'workbooks': {
+            wb['filename']: {
+                'sha256': hashes[wb['filename']],
+                'csv_files': [csv_filename(wb['filename'], s['name']) for s in wb['sheets']],
+                'npy_files': [name for s in wb['sheets']
+                              for name in export_filenames(wb['filename'], s['name'])[1:]],
+            }
+            for wb in all_workbooks
+        },
+    }
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
     print(f"\n{'='*60}")
     print(f"Summary saved to: {summary_path}")
-    print(f"Total workbooks processed: {len(all_workbooks)}")
+    print(f"Total workbooks processed: {len(pending)} "
+          f"({len(all_workbooks) - len(pending)} unchanged)")
 
     # Print formula summary
     print(f"\n{'='*60}")
@@ -0,0 +1,953 @@
+#!/usr/bin/env python3
+"""
+Formula dependency graph and incremental recalculation for Alecia Colab Sheets.
+
+Parses the workbook formulas collected by extract_excel_data.py, builds a cell
+dependency graph across sheets (single cells, ranges and cross-sheet
+references), orders it topologically and recomputes only the dirty part of the
+graph when an input changes. Range functions are evaluated with NumPy over
+per-sheet value arrays.
+
+Run directly to check the engine against the computed values captured in
+csv_exports/workbooks_summary.json for the bundled templates.
+"""
+
+import os
+import re
+import json
+import math
+import argparse
+from collections import defaultdict, deque
+from datetime import date, datetime, time
+
+import numpy as np
+from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.datetime import to_excel
+
+XLSX_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(XLSX_DIR, 'csv_exports')
+SUMMARY_PATH = os.path.join(OUTPUT_DIR, 'workbooks_summary.json')
+
+
+class ExcelError(str):
+    """An Excel error value (#DIV/0!, #VALUE!...), propagated like any value."""
+
+
+DIV0 = ExcelError('#DIV/0!')
+VALUE = ExcelError('#VALUE!')
+NUM = ExcelError('#NUM!')
+NAME = ExcelError('#NAME?')
+NA = ExcelError('#N/A')
+ERRORS = {e: e for e in (DIV0, VALUE, NUM, NAME, NA, ExcelError('#REF!'), ExcelError('#NULL!'))}
+
+
+class FormulaError(ValueError):
+    """A formula uses syntax the engine does not support."""
+
+
+class CircularReferenceError(ValueError):
+    """The dependency graph has a cycle."""
+
+
+# ============================================================================
+# Parsing
+# ============================================================================
+
+TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<string>"(?:[^"]|"")*")
+  | (?P<error>\#(?:DIV/0!|VALUE!|REF!|NAME\?|NUM!|N/A|NULL!))
+  | (?P<func>[^\W\d][\w.]*(?=\())
+  | (?P<ref>(?:(?:'(?:[^']|'')+'|[^\W\d][\w.]*)!)?\$?[A-Za-z]{1,3}\$?\d+(?::\$?[A-Za-z]{1,3}\$?\d+)?)
+  | (?P<bool>TRUE|FALSE)\b
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<op><=|>=|<>|[-+*/^&=<>%(),])
+""", re.VERBOSE)
+
+CELL_RE = re.compile(r'\$?([A-Za-z]{1,3})\$?(\d+)$')
+
+# Binary operator precedence, lowest first (all left-associative, like Excel)
+BINARY_OPS = {
+    '=': 1, '<>': 1, '<': 1, '>': 1, '<=': 1, '>=': 1,
+    '&': 2,
+    '+': 3, '-': 3,
+    '*': 4, '/': 4,
+    '^': 5,
+}
+
+
+def parse_cell(ref):
+    """'B12' / '$B$12' -> (row, col)"""
+    match = CELL_RE.match(ref)
+    if not match:
+        raise FormulaError(f"Invalid cell reference: {ref}")
+    return int(match.group(2)), column_index_from_string(match.group(1).upper())
+
+
+def tokenize(formula):
+    tokens = []
+    pos = 0
+    while pos < len(formula):
+        match = TOKEN_RE.match(formula, pos)
+        if not match:
+            raise FormulaError(f"Unexpected character at {pos}: {formula[pos:]!r}")
+        pos = match.end()
+        if match.lastgroup != 'ws':
+            tokens.append((match.lastgroup, match.group()))
+    return tokens
+
+
+class Parser:
+    """Recursive-descent parser producing tuple ASTs.
+
+    Nodes: ('num', float), ('str', text), ('bool', flag), ('error', e),
+    ('ref', sheet, row, col), ('range', sheet, r1, c1, r2, c2),
+    ('call', NAME, [args]), ('binop', op, left, right), ('neg', x), ('pct', x).
+    """
+
+    def __init__(self, formula, sheet):
+        self.tokens = tokenize(formula[1:] if formula.startswith('=') else formula)
+        self.pos = 0
+        self.sheet = sheet
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, text=None):
+        token = self.peek()
+        if token[0] is None or (kind and token[0] != kind) or (text and token[1] != text):
+            raise FormulaError(f"Expected {text or kind}, got {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.expression(1)
+        if self.pos != len(self.tokens):
+            raise FormulaError(f"Unexpected token {self.peek()[1]!r}")
+        return node
+
+    def expression(self, min_prec):
+        left = self.unary()
+        while True:
+            kind, text = self.peek()
+            prec = BINARY_OPS.get(text) if kind == 'op' else None
+            if prec is None or prec < min_prec:
+                return left
+            self.pos += 1
+            left = ('binop', text, left, self.expression(prec + 1))
+
+    def unary(self):
+        kind, text = self.peek()
+        if kind == 'op' and text in '+-':
+            self.pos += 1
+            operand = self.unary()
+            return ('neg', operand) if text == '-' else operand
+        node = self.primary()
+        while self.peek() == ('op', '%'):
+            self.pos += 1
+            node = ('pct', node)
+        return node
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == 'number':
+            return ('num', float(text))
+        if kind == 'string':
+            return ('str', text[1:-1].replace('""', '"'))
+        if kind == 'bool':
+            return ('bool', text == 'TRUE')
+        if kind == 'error':
+            return ('error', ERRORS[text])
+        if kind == 'ref':
+            return self.reference(text)
+        if kind == 'func':
+            self.take('op', '(')
+            args = []
+            if self.peek() != ('op', ')'):
+                args.append(self.expression(1))
+                while self.peek() == ('op', ','):
+                    self.pos += 1
+                    args.append(self.expression(1))
+            self.take('op', ')')
+            return ('call', text.upper(), args)
+        if (kind, text) == ('op', '('):
+            node = self.expression(1)
+            self.take('op', ')')
+            return node
+        raise FormulaError(f"Unexpected token {text!r}")
+
+    def reference(self, text):
+        sheet = self.sheet
+        if '!' in text:
+            sheet, text = text.rsplit('!', 1)
+            if sheet.startswith("'"):
+                sheet = sheet[1:-1].replace("''", "'")
+        if ':' not in text:
+            return ('ref', sheet) + parse_cell(text)
+        (r1, c1), (r2, c2) = (parse_cell(part) for part in text.split(':'))
+        return ('range', sheet, min(r1, r2), min(c1, c2), max(r1, r2), max(c1, c2))
+
+
+def parse_formula(formula, sheet):
+    return Parser(formula, sheet).parse()
+
+
+def references(node):
+    """Yield every 'ref' and 'range' node of an AST."""
+    if node[0] in ('ref', 'range'):
+        yield node
+    elif node[0] == 'call':
+        for arg in node[2]:
+            yield from references(arg)
+    elif node[0] == 'binop':
+        yield from references(node[2])
+        yield from references(node[3])
+    elif node[0] in ('neg', 'pct'):
+        yield from references(node[1])
+
+
+# ============================================================================
+# Values
+# ============================================================================
+
+def normalize_value(value):
+    """Convert an openpyxl cell value to an engine value."""
+    if isinstance(value, (datetime, date, time)):
+        return float(to_excel(value))
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str) and value in ERRORS:
+        return ERRORS[value]
+    return value
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def to_number(value):
+    """Scalar coercion used by arithmetic: blank -> 0, TRUE -> 1, "12" -> 12."""
+    if isinstance(value, ExcelError):
+        return value
+    if value is None:
+        return 0.0
+    if isinstance(value, bool):
+        return float(value)
+    if is_number(value):
+        return float(value)
+    try:
+        return float(value.strip())
+    except ValueError:
+        return VALUE
+
+
+def to_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if is_number(value):
+        if float(value).is_integer():
+            return str(int(value))
+        return f'{value:.15g}'
+    return str(value)
+
+
+def to_bool(value):
+    if isinstance(value, ExcelError):
+        return value
+    if value is None:
+        return False
+    if isinstance(value, str):
+        if value.upper() in ('TRUE', 'FALSE'):
+            return value.upper() == 'TRUE'
+        return VALUE
+    return bool(value)
+
+
+def first_error(*values):
+    for value in values:
+        if isinstance(value, ExcelError):
+            return value
+    return None
+
+
+def compare(op, left, right):
+    error = first_error(left, right)
+    if error:
+        return error
+    # Blank takes the type of the other side
+    if left is None:
+        left = '' if isinstance(right, str) else (False if isinstance(right, bool) else 0.0)
+    if right is None:
+        right = '' if isinstance(left, str) else (False if isinstance(left, bool) else 0.0)
+
+    def rank(value):
+        # Excel orders numbers < text < booleans
+        if isinstance(value, bool):
+            return 2
+        return 1 if isinstance(value, str) else 0
+
+    left_key = (rank(left), left.casefold() if isinstance(left, str) else left)
+    right_key = (rank(right), right.casefold() if isinstance(right, str) else right)
+    return {
+        '=': left_key == right_key,
+        '<>': left_key != right_key,
+        '<': left_key < right_key,
+        '>': left_key > right_key,
+        '<=': left_key <= right_key,
+        '>=': left_key >= right_key,
+    }[op]
+
+
+def arithmetic(op, left, right):
+    left, right = to_number(left), to_number(right)
+    error = first_error(left, right)
+    if error:
+        return error
+    if op == '+':
+        return left + right
+    if op == '-':
+        return left - right
+    if op == '*':
+        return left * right
+    if op == '/':
+        return DIV0 if right == 0 else left / right
+    try:
+        result = left ** right
+    except (OverflowError, ZeroDivisionError):
+        return NUM
+    return NUM if isinstance(result, complex) else result
+
+
+def excel_round(value, digits):
+    """ROUND: half away from zero, like Excel."""
+    factor = 10.0 ** digits
+    return math.copysign(math.floor(abs(value) * factor + 0.5) / factor, value)
+
+
+class SheetData:
+    """Cell values of one sheet, mirrored in NumPy arrays for range functions.
+
+    values: the Python values; numbers: float value or NaN (text, booleans and
+    blanks are NaN, as range functions ignore them); texts: casefolded strings
+    ('' for non-text) for COUNTIF; filled / errors: boolean masks.
+    """
+
+    def __init__(self, rows, cols):
+        self.values = np.full((rows, cols), None, dtype=object)
+        self.numbers = np.full((rows, cols), np.nan)
+        self.texts = np.full((rows, cols), '', dtype=object)
+        self.filled = np.zeros((rows, cols), dtype=bool)
+        self.errors = np.zeros((rows, cols), dtype=bool)
+
+    def ensure(self, row, col):
+        rows, cols = self.values.shape
+        if row <= rows and col <= cols:
+            return
+        shape = (max(rows, row), max(cols, col))
+        for name, fill in (('values', None), ('numbers', np.nan), ('texts', ''),
+                           ('filled', False), ('errors', False)):
+            old = getattr(self, name)
+            new = np.full(shape, fill, dtype=old.dtype)
+            new[:rows, :cols] = old
+            setattr(self, name, new)
+
+    def set(self, row, col, value):
+        self.ensure(row, col)
+        r, c = row - 1, col - 1
+        self.values[r, c] = value
+        self.numbers[r, c] = value if is_number(value) else np.nan
+        is_text = isinstance(value, str) and not isinstance(value, ExcelError)
+        self.texts[r, c] = value.casefold() if is_text else ''
+        self.filled[r, c] = value is not None
+        self.errors[r, c] = isinstance(value, ExcelError)
+
+    def get(self, row, col):
+        rows, cols = self.values.shape
+        if row > rows or col > cols:
+            return None
+        return self.values[row - 1, col - 1]
+
+    def block(self, r1, c1, r2, c2):
+        return Block(self, (slice(r1 - 1, r2), slice(c1 - 1, c2)), (r2 - r1 + 1) * (c2 - c1 + 1))
+
+
+class Block:
+    """A range argument: views into a sheet's arrays (clipped to the used area)."""
+
+    def __init__(self, sheet, index, size):
+        self.sheet = sheet
+        self.index = index
+        self.size = size  # cells in the range, including those beyond the used area
+
+    def numbers(self):
+        values = self.sheet.numbers[self.index]
+        return values[~np.isnan(values)]
+
+    def error(self):
+        errors = self.sheet.errors[self.index]
+        if errors.any():
+            return self.sheet.values[self.index][errors][0]
+        return None
+
+    def scalar(self):
+        """Value of a range used where a single value is expected."""
+        if self.size != 1:
+            return VALUE
+        values = self.sheet.values[self.index]
+        return values[0, 0] if values.size else None
+
+
+# ============================================================================
+# Functions
+# ============================================================================
+
+CRITERIA_RE = re.compile(r'^(<=|>=|<>|<|>|=)?(.*)$', re.DOTALL)
+
+
+def collect_numbers(args):
+    """Numbers of all arguments: ranges contribute their numeric cells only."""
+    arrays = []
+    for arg in args:
+        if isinstance(arg, Block):
+            error = arg.error()
+            if error:
+                return error
+            arrays.append(arg.numbers())
+        else:
+            number = to_number(arg)
+            if isinstance(number, ExcelError):
+                return number
+            arrays.append(np.array([number]))
+    return np.concatenate(arrays) if arrays else np.empty(0)
+
+
+def numeric_function(reducer, empty):
+    def function(args):
+        numbers = collect_numbers(args)
+        if isinstance(numbers, ExcelError):
+            return numbers
+        if numbers.size == 0:
+            return empty
+        return float(reducer(numbers))
+    return function
+
+
+def fn_stdev(args):
+    numbers = collect_numbers(args)
+    if isinstance(numbers, ExcelError):
+        return numbers
+    if numbers.size < 2:
+        return DIV0
+    return float(np.std(numbers, ddof=1))
+
+
+def fn_count(args):
+    count = 0
+    for arg in args:
+        if isinstance(arg, Block):
+            count += int(np.count_nonzero(~np.isnan(arg.sheet.numbers[arg.index])))
+        elif is_number(arg):
+            count += 1
+    return float(count)
+
+
+def fn_counta(args):
+    count = 0
+    for arg in args:
+        if isinstance(arg, Block):
+            count += int(np.count_nonzero(arg.sheet.filled[arg.index]))
+        elif arg is not None:
+            count += 1
+    return float(count)
+
+
+def wildcard_regex(pattern):
+    """Excel wildcards (* ? with ~ escapes) -> compiled regex."""
+    parts = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            parts.append(re.escape(char))
+            escaped = False
+        elif char == '~':
+            escaped = True
+        elif char == '*':
+            parts.append('.*')
+        elif char == '?':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return re.compile(''.join(parts) + r'\Z', re.DOTALL)
+
+
+def fn_countif(args):
+    if len(args) != 2 or not isinstance(args[0], Block):
+        return VALUE
+    block, criterion = args
+    if isinstance(criterion, Block):
+        criterion = criterion.scalar()
+    if isinstance(criterion, ExcelError):
+        return criterion
+    sheet, index = block.sheet, block.index
+    # Cells outside the used area are blank
+    blanks_outside = block.size - sheet.values[index].size
+
+    if isinstance(criterion, str):
+        op, operand = CRITERIA_RE.match(criterion).groups()
+        op = op or '='
+    else:
+        op, operand = '=', criterion
+
+    number = operand if is_number(operand) else None
+    if isinstance(operand, str):
+        try:
+            number = float(operand)
+        except ValueError:
+            pass
+
+    if isinstance(operand, bool):
+        values = sheet.values[index]
+        matches = np.vectorize(lambda v: v is operand, otypes=[bool])(values)
+        count = int(np.count_nonzero(matches))
+        if op == '<>':
+            count = block.size - count
+        return float(count)
+
+    if number is not None:
+        numbers = sheet.numbers[index]
+        with np.errstate(invalid='ignore'):
+            matches = {
+                '=': numbers == number, '<>': numbers == number,
+                '<': numbers < number, '>': numbers > number,
+                '<=': numbers <= number, '>=': numbers >= number,
+            }[op]
+        count = int(np.count_nonzero(matches))
+        # "<>n" also counts blanks and text
+        return float(block.size - count if op == '<>' else count)
+
+    operand = operand.casefold()
+    texts = sheet.texts[index]
+    is_text = sheet.filled[index] & (texts != '') | (sheet.values[index] == '')
+    if operand == '' and op in ('=', '<>'):
+        blank = int(np.count_nonzero(~sheet.filled[index])) + blanks_outside
+        return float(blank if op == '=' else block.size - blank)
+    if op in ('=', '<>'):
+        if '*' in operand or '?' in operand or '~' in operand:
+            regex = wildcard_regex(operand)
+            matches = np.vectorize(lambda t: bool(regex.match(t)), otypes=[bool])(texts) & is_text
+        else:
+            matches = (texts == operand) & is_text
+        count = int(np.count_nonzero(matches))
+        return float(block.size - count if op == '<>' else count)
+    compare_text = {
+        '<': lambda t: t < operand, '>': lambda t: t > operand,
+        '<=': lambda t: t <= operand, '>=': lambda t: t >= operand,
+    }[op]
+    matches = np.vectorize(compare_text, otypes=[bool])(texts) & is_text
+    return float(np.count_nonzero(matches))
+
+
+def fn_round(args):
+    if len(args) != 2:
+        return VALUE
+    value, digits = (to_number(a.scalar() if isinstance(a, Block) else a) for a in args)
+    error = first_error(value, digits)
+    if error:
+        return error
+    return excel_round(value, int(digits))
+
+
+def fn_abs(args):
+    if len(args) != 1:
+        return VALUE
+    value = to_number(args[0].scalar() if isinstance(args[0], Block) else args[0])
+    return value if isinstance(value, ExcelError) else abs(value)
+
+
+def logical_function(reducer):
+    def function(args):
+        flags = []
+        for arg in args:
+            if isinstance(arg, Block):
+                error = arg.error()
+                if error:
+                    return error
+                flags.extend(bool(v) for v in arg.sheet.values[arg.index].ravel()
+                             if isinstance(v, bool) or is_number(v))
+            else:
+                flag = to_bool(arg)
+                if isinstance(flag, ExcelError):
+                    return flag
+                flags.append(flag)
+        return reducer(flags) if flags else VALUE
+    return function
+
+
+def fn_not(args):
+    if len(args) != 1:
+        return VALUE
+    flag = to_bool(args[0].scalar() if isinstance(args[0], Block) else args[0])
+    return flag if isinstance(flag, ExcelError) else not flag
+
+
+FUNCTIONS = {
+    'SUM': numeric_function(np.sum, 0.0),
+    'AVERAGE': numeric_function(np.mean, DIV0),
+    'MIN': numeric_function(np.min, 0.0),
+    'MAX': numeric_function(np.max, 0.0),
+    'MEDIAN': numeric_function(np.median, NUM),
+    'STDEV': fn_stdev,
+    'COUNT': fn_count,
+    'COUNTA': fn_counta,
+    'COUNTIF': fn_countif,
+    'ROUND': fn_round,
+    'ABS': fn_abs,
+    'AND': logical_function(all),
+    'OR': logical_function(any),
+    'NOT': fn_not,
+}
+
+
+# ============================================================================
+# Workbook model
+# ============================================================================
+
+def cell_name(cell):
+    sheet, row, col = cell
+    return f"{sheet}!{get_column_letter(col)}{row}"
+
+
+class WorkbookModel:
+    """Cell values, formulas and their dependency graph for one workbook.
+
+    Cells are (sheet, row, col) tuples. After build_graph(), `order` lists the
+    formula cells so that every cell comes after the formula cells it reads.
+    set_value() marks the dependents of a changed input dirty and
+    recalculate() re-evaluates only those, in topological order.
+    """
+
+    def __init__(self):
+        self.sheets = {}
+        self.formulas = {}        # cell -> formula text
+        self.asts = {}            # cell -> parsed formula
+        self.unsupported = {}     # cell -> parse error message
+        self.precedents = {}      # formula cell -> formula cells it reads
+        self.dependents = defaultdict(set)
+        self.cell_readers = defaultdict(set)  # any cell -> formulas reading it directly
+        self.range_readers = {}   # sheet -> (bounds array (n, 4), [formula cells])
+        self.order = []
+        self.position = {}
+        self.dirty = set()
+
+    @classmethod
+    def from_xlsx(cls, filepath):
+        """Load inputs, cached formula results and formulas of a workbook."""
+        model = cls()
+        wb_formulas = load_workbook(filepath, read_only=True, data_only=False)
+        wb_values = load_workbook(filepath, read_only=True, data_only=True)
+        for sheet_name in wb_formulas.sheetnames:
+            ws_formulas = wb_formulas[sheet_name]
+            ws_values = wb_values[sheet_name]
+            if not ws_formulas.max_row or not ws_formulas.max_column:
+                ws_formulas.calculate_dimension(force=True)
+            data = model.add_sheet(sheet_name, ws_formulas.max_row or 1,
+                                   ws_formulas.max_column or 1)
+            rows = zip(ws_formulas.iter_rows(values_only=True),
+                       ws_values.iter_rows(values_only=True))
+            for row, (formula_row, value_row) in enumerate(rows, 1):
+                for col, (formula, value) in enumerate(zip(formula_row, value_row), 1):
+                    if isinstance(formula, str) and formula.startswith('='):
+                        model.formulas[(sheet_name, row, col)] = formula
+                    if value is not None:
+                        # Formula cells start from their cached value
+                        data.set(row, col, normalize_value(value))
+        wb_formulas.close()
+        wb_values.close()
+        model.build_graph()
+        return model
+
+    def add_sheet(self, name, rows=1, cols=1):
+        self.sheets[name] = SheetData(rows, cols)
+        return self.sheets[name]
+
+    def set_formula(self, sheet, ref, formula):
+        """Add or replace a formula; call build_graph() afterwards."""
+        self.formulas[(sheet,) + parse_cell(ref)] = formula
+
+    def build_graph(self):
+        """Parse every formula and order the formula cells topologically."""
+        self.asts.clear()
+        self.unsupported.clear()
+        self.precedents.clear()
+        self.dependents.clear()
+        self.cell_readers.clear()
+        ranges = defaultdict(list)
+
+        for cell, formula in self.formulas.items():
+            try:
+                self.asts[cell] = parse_formula(formula, cell[0])
+            except (FormulaError, KeyError) as e:
+                # Keeps its cached value and is never recomputed
+                self.unsupported[cell] = str(e)
+                continue
+            for node in references(self.asts[cell]):
+                if node[0] == 'ref':
+                    self.cell_readers[node[1:]].add(cell)
+                else:
+                    ranges[node[1]].append((node[2:], cell))
+
+        self.range_readers = {
+            sheet: (np.array([bounds for bounds, _ in entries]), [c for _, c in entries])
+            for sheet, entries in ranges.items()
+        }
+
+        # Formula -> formula edges, ranges resolved against the formula cells
+        formula_cells = list(self.asts)
+        for cell in formula_cells:
+            self.precedents[cell] = set()
+        by_sheet = defaultdict(list)
+        for cell in formula_cells:
+            by_sheet[cell[0]].append(cell)
+        for target, readers in self.cell_readers.items():
+            if target in self.asts:
+                for reader in readers:
+                    self.precedents[reader].add(target)
+        for sheet, (bounds, readers) in self.range_readers.items():
+            cells = by_sheet.get(sheet)
+            if not cells:
+                continue
+            rows = np.array([c[1] for c in cells])
+            cols = np.array([c[2] for c in cells])
+            for (r1, c1, r2, c2), reader in zip(bounds, readers):
+                inside = (rows >= r1) & (rows <= r2) & (cols >= c1) & (cols <= c2)
+                for i in np.flatnonzero(inside):
+                    self.precedents[reader].add(cells[i])
+        for cell, precedents in self.precedents.items():
+            for precedent in precedents:
+                self.dependents[precedent].add(cell)
+
+        # Kahn's algorithm
+        pending = {cell: len(precedents) for cell, precedents in self.precedents.items()}
+        ready = deque(sorted(cell for cell, count in pending.items() if count == 0))
+        self.order = []
+        while ready:
+            cell = ready.popleft()
+            self.order.append(cell)
+            for dependent in sorted(self.dependents[cell]):
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        if len(self.order) != len(pending):
+            cycle = sorted(cell_name(c) for c, count in pending.items() if count > 0)
+            raise CircularReferenceError(f"Circular references: {', '.join(cycle[:10])}")
+        self.position = {cell: i for i, cell in enumerate(self.order)}
+        self.dirty = set(self.order)
+
+    def readers_of(self, cell):
+        """Formula cells that read `cell` directly (as a cell or within a range)."""
+        readers = set(self.cell_readers.get(cell, ()))
+        entry = self.range_readers.get(cell[0])
+        if entry:
+            bounds, range_readers = entry
+            _, row, col = cell
+            inside = ((bounds[:, 0] <= row) & (bounds[:, 2] >= row)
+                      & (bounds[:, 1] <= col) & (bounds[:, 3] >= col))
+            readers.update(range_readers[i] for i in np.flatnonzero(inside))
+        return readers
+
+    def mark_dirty(self, cell):
+        queue = deque(self.readers_of(cell))
+        while queue:
+            current = queue.popleft()
+            if current in self.dirty or current not in self.position:
+                continue
+            self.dirty.add(current)
+            queue.extend(self.dependents[current])
+
+    def set_value(self, sheet, ref, value):
+        """Change an input cell and mark everything that depends on it dirty."""
+        cell = (sheet,) + parse_cell(ref)
+        if cell in self.formulas:
+            raise ValueError(f"{cell_name(cell)} holds a formula; use set_formula()")
+        self.sheets[sheet].set(cell[1], cell[2], normalize_value(value))
+        self.mark_dirty(cell)
+
+    def value(self, sheet, ref):
+        row, col = parse_cell(ref)
+        return self.sheets[sheet].get(row, col)
+
+    def recalculate(self):
+        """Evaluate the dirty formula cells in topological order.
+
+        Returns {cell: new value} for the cells that were evaluated.
+        """
+        results = {}
+        for cell in sorted(self.dirty, key=self.position.__getitem__):
+            value = self.evaluate(self.asts[cell])
+            if isinstance(value, Block):
+                value = value.scalar()
+            if value is None:
+                value = 0.0  # "=A1" on a blank cell shows 0
+            self.sheets[cell[0]].set(cell[1], cell[2], value)
+            results[cell] = value
+        self.dirty.clear()
+        return results
+
+    def recalculate_all(self):
+        self.dirty = set(self.order)
+        return self.recalculate()
+
+    def evaluate(self, node):
+        """Evaluate an AST. Ranges (and refs used as function args) come back as Blocks."""
+        kind = node[0]
+        if kind in ('num', 'str', 'bool', 'error'):
+            return node[1]
+        if kind == 'ref':
+            sheet = self.sheets.get(node[1])
+            return ERRORS['#REF!'] if sheet is None else sheet.get(node[2], node[3])
+        if kind == 'range':
+            sheet = self.sheets.get(node[1])
+            return ERRORS['#REF!'] if sheet is None else sheet.block(*node[2:])
+        if kind == 'neg':
+            value = to_number(self.scalar(node[1]))
+            return value if isinstance(value, ExcelError) else -value
+        if kind == 'pct':
+            value = to_number(self.scalar(node[1]))
+            return value if isinstance(value, ExcelError) else value / 100
+        if kind == 'binop':
+            op = node[1]
+            left, right = self.scalar(node[2]), self.scalar(node[3])
+            if op == '&':
+                error = first_error(left, right)
+                return error or to_text(left) + to_text(right)
+            if op in ('+', '-', '*', '/', '^'):
+                return arithmetic(op, left, right)
+            return compare(op, left, right)
+        if kind == 'call':
+            return self.call(node[1], node[2])
+        raise FormulaError(f"Unknown node {kind}")
+
+    def scalar(self, node):
+        value = self.evaluate(node)
+        return value.scalar() if isinstance(value, Block) else value
+
+    def argument(self, node):
+        """Function argument: single-cell refs behave like 1x1 ranges."""
+        if node[0] == 'ref' and node[1] in self.sheets:
+            return self.sheets[node[1]].block(node[2], node[3], node[2], node[3])
+        return self.evaluate(node)
+
+    def call(self, name, args):
+        # IF / IFERROR only evaluate the branch they return
+        if name == 'IF':
+            if not 1 < len(args) < 4:
+                return VALUE
+            condition = to_bool(self.scalar(args[0]))
+            if isinstance(condition, ExcelError):
+                return condition
+            if condition:
+                return self.evaluate(args[1])
+            return self.evaluate(args[2]) if len(args) == 3 else False
+        if name == 'IFERROR':
+            if len(args) != 2:
+                return VALUE
+            value = self.scalar(args[0])
+            return self.evaluate(args[1]) if isinstance(value, ExcelError) else value
+        function = FUNCTIONS.get(name)
+        if function is None:
+            return NAME
+        return function([self.argument(arg) for arg in args])
+
+    def graph(self):
+        """JSON-serializable dependency graph: precedents per formula cell and order."""
+        return {
+            'order': [cell_name(cell) for cell in self.order],
+            'precedents': {
+                cell_name(cell): sorted(cell_name(p) for p in precedents)
+                for cell, precedents in self.precedents.items()
+            },
+            'unsupported': {cell_name(cell): error for cell, error in self.unsupported.items()},
+        }
+
+
+# ============================================================================
+# Verification against the cached values of the bundled templates
+# ============================================================================
+
+def matches_cached(value, expected):
+    """Compare an engine value with a computed_value string from the summary."""
+    if isinstance(value, bool):
+        return str(value) == expected
+    if is_number(value):
+        try:
+            return math.isclose(value, float(expected), rel_tol=1e-9, abs_tol=1e-9)
+        except ValueError:
+            return False
+    return to_text(value) == expected
+
+
+def verify_workbook(filepath, summary_entry):
+    """Recalculate a workbook from scratch and compare with its captured values.
+
+    Returns (checked, mismatches) where mismatches lists (cell, formula,
+    expected, got).
+    """
+    model = WorkbookModel.from_xlsx(filepath)
+    results = model.recalculate_all()
+    checked = 0
+    mismatches = []
+    for sheet in summary_entry['sheets']:
+        for record in sheet['formulas']:
+            if record['computed_value'] is None:
+                continue  # never calculated by Excel
+            cell = (sheet['name'],) + parse_cell(record['cell'])
+            if cell in model.unsupported:
+                mismatches.append((cell_name(cell), record['formula'],
+                                   record['computed_value'], model.unsupported[cell]))
+                continue
+            checked += 1
+            got = results.get(cell)
+            if not matches_cached(got, record['computed_value']):
+                mismatches.append((cell_name(cell), record['formula'],
+                                   record['computed_value'], got))
+    return model, checked, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--write-graphs', action='store_true',
+                        help='write <workbook>_formula_graph.json to csv_exports')
+    args = parser.parse_args()
+
+    with open(SUMMARY_PATH, encoding='utf-8') as f:
+        summary = json.load(f)
+
+    total_checked = 0
+    total_mismatches = 0
+    for entry in summary:
+        filepath = os.path.join(XLSX_DIR, entry['filename'])
+        model, checked, mismatches = verify_workbook(filepath, entry)
+        total_checked += checked
+        total_mismatches += len(mismatches)
+        status = '✓' if not mismatches else '✗'
+        print(f"{status} {entry['filename']}: {len(model.order)} formulas, "
+              f"{checked} checked against cached values, {len(mismatches)} mismatches")
+        for name, formula, expected, got in mismatches:
+            print(f"    {name} {formula}: expected {expected}, got {got}")
+
+        if args.write_graphs:
+            graph_path = os.path.join(
+                OUTPUT_DIR, f"{os.path.splitext(entry['filename'])[0]}_formula_graph.json")
+            with open(graph_path, 'w', encoding='utf-8') as f:
+                json.dump(model.graph(), f, indent=2, ensure_ascii=False)
+
+    print(f"\nChecked {total_checked} formulas, {total_mismatches} mismatches")
+    return 1 if total_mismatches else 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
+import argparse
+import hashlib
 import json
 import logging
+import os
+import queue
 import re
+import threading
 import time
+import unicodedata
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
 
@@ -15,9 +23,335 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Field order of the compact rows sent back by parse workers
+LISTING_FIELDS = (
+    "title",
+    "url",
+    "sector",
+    "location",
+    "ca",
+    "price",
+    "date",
+    "source",
+    "scraped_at",
+    "ca_clean",
+    "price_clean",
+)
+
+MAX_PAGES = 50  # Safety limit
+
+# Amount grammar shared by clean_amount and normalize_listings:
+# "5 M€", "1,5 M€", "500 k€", "1 200 000 €", "1.200.000 €", "2 millions d'euros"
+AMOUNT_RE = re.compile(
+    r"(?P<num>\d{1,3}(?:[\s\u00a0\u202f.]\d{3})+(?:,\d+)?|\d+(?:[.,]\d+)?)"
+    r"\s*(?P<unit>milliards?|mds?|millions?|mille|keur|meur|k|m)?(?![a-zà-ÿ])",
+    re.IGNORECASE,
+)
+# Spaces and "." thousands separators, removed before parsing the number
+THOUSANDS_SEP_RE = re.compile(r"[\s\u00a0\u202f]|\.(?=\d{3}(?:\D|$))")
+UNIT_MULTIPLIERS = {
+    "k": 1_000,
+    "keur": 1_000,
+    "mille": 1_000,
+    "m": 1_000_000,
+    "meur": 1_000_000,
+    "million": 1_000_000,
+    "millions": 1_000_000,
+    "md": 1_000_000_000,
+    "mds": 1_000_000_000,
+    "milliard": 1_000_000_000,
+    "milliards": 1_000_000_000,
+}
+
+FRENCH_MONTHS = {
+    "janvier": 1,
+    "février": 2,
+    "fevrier": 2,
+    "mars": 3,
+    "avril": 4,
+    "mai": 5,
+    "juin": 6,
+    "juillet": 7,
+    "août": 8,
+    "aout": 8,
+    "septembre": 9,
+    "octobre": 10,
+    "novembre": 11,
+    "décembre": 12,
+    "decembre": 12,
+}
+NUMERIC_DATE_RE = (
+    r"(?P<day>\d{1,2})[/.-](?P<month>\d{1,2})[/.-](?P<year>\d{4})"
+    r"|(?P<iso_year>\d{4})-(?P<iso_month>\d{2})-(?P<iso_day>\d{2})"
+)
+TEXT_DATE_RE = (
+    r"(?:(?P<day>\d{1,2})(?:er)?\s+)?(?P<month>"
+    + "|".join(FRENCH_MONTHS)
+    + r")\s+(?P<year>\d{4})"
+)
+# "Paris (75)", "75008 Paris", "Corse (2A)"
+DEPARTMENT_RE = r"\((?P<dept>\d{2,3}|2[ab])\)|\b(?P<postal>\d{2})\d{3}\b"
+
+FUSACQ_CATEGORIES = {
+    "repreneurs": ["https://www.fusacq.com/annuaire-repreneurs_fr_"],
+    "banks_advisors": [
+        "https://www.fusacq.com/classement/classement-banques-affaires-conseils-fusions-acquisitions?codePays=_fr_"
+    ],
+    "investment_funds": ["https://www.fusacq.com/annuaire-fonds-investissement_fr_"],
+    "valuations": ["https://www.fusacq.com/base-valorisations_fr_"],
+    "expert_opinions": ["https://www.fusacq.com/avis-experts_fr_"],
+    "cession_actifs": [
+        "https://www.fusacq.com/reprendre-une-entreprise/resultats-cession-actifs_fr_?id_localisation=&reference_mots_cles=&id_secteur_activite=&id_secteur_activite2=&id_secteur_activite3=&id_secteur_activite_fonds=&type_cession=&id_raison_cession=&immo_a_vendre=&prix_cession=&prix_cession_null=1&type_repreneur_personne=&type_repreneur_societe=&apport_demande=&apport_demande_null=1&ca=&ca_null=1&resultat_net=&nb_personnes=&redressement_judiciaire=&prix_cession_min=&prix_cession_max=5000000&ca_min=&ca_max=20000000&apport_min=&apport_max=2000000&nb_personnes_min=&nb_personnes_max=200&date_min=2011&date_max=2021&possession_brevets=&possession_marques=&travail_export=&id_gestionnaire_fonds=&societe_cotee=&type_recherche=5&type_acquereur=&demarche=&tri=&type_partenariat=&recherche_par=motscles"
+    ],
+    # Add your other long URLs here...
+}
+
+
+def page_url(base_url, page):
+    """Build the URL of a listing page: ?params&page=1, ?params&page=2..."""
+    if "?" in base_url:
+        return f"{base_url}&page={page}"
+    return f"{base_url}?page={page}"
+
+
+def page_has_next(soup):
+    """Check for next page indicators on a parsed listing page"""
+    next_btn = soup.select_one('a.next, .pagination-next, [rel="next"], .suivant')
+
+    # Stop conditions
+    if not next_btn or "disabled" in str(next_btn.get("class", [])):
+        logger.info("No next button - end of pagination")
+        return False
+
+    if "dernière" in str(soup).lower() or "last" in str(soup).lower():
+        logger.info("Last page indicator found")
+        return False
+
+    return True
+
+
+# Histogram bucket upper bounds, in seconds
+FETCH_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30)
+PARSE_TIME_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Selector labels for pages where the cascade did not match
+FALLBACK_SELECTOR = "fallback: a[href][title], div a[href]"
+NO_SELECTOR = "none"
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus semantics"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """[(le, cumulative count), ...] including +Inf"""
+        total = 0
+        buckets = []
+        for bound, count in zip((*self.bounds, "+Inf"), self.counts):
+            total += count
+            buckets.append((str(bound), total))
+        return buckets
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "buckets": dict(self.cumulative()),
+        }
+
+
+def _prom_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CrawlMetrics:
+    """Structured crawl metrics: per-host fetch stats, parse times, selector hits.
+
+    Thread-safe, so fetcher threads and parse callbacks of crawl_pipeline can
+    record into the same instance.
+    """
 
-class FrenchMABScraper:
     def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.hosts = defaultdict(
+            lambda: {
+                "requests": 0,
+                "retries": 0,
+                "errors": 0,
+                "bytes": 0,
+                "cache_hits": 0,
+                "status_codes": Counter(),
+                "latency": Histogram(FETCH_LATENCY_BUCKETS),
+            }
+        )
+        self.parse_time = Histogram(PARSE_TIME_BUCKETS)
+        self.pages_parsed = 0
+        self.items_parsed = 0
+        self.pages_discarded = 0
+        self.selectors = Counter()
+
+    def record_fetch(self, url, seconds, status=None, size=0, retry=False, error=False):
+        with self.lock:
+            host = self.hosts[urlparse(url).netloc]
+            host["requests"] += 1
+            host["retries"] += int(retry)
+            host["errors"] += int(error)
+            host["bytes"] += size
+            if status is not None:
+                host["status_codes"][str(status)] += 1
+            host["latency"].observe(seconds)
+
+    def record_cache_hit(self, url, size):
+        with self.lock:
+            host = self.hosts[urlparse(url).netloc]
+            host["cache_hits"] += 1
+            host["bytes"] += size
+
+    def record_parse(self, seconds, selector, items):
+        with self.lock:
+            self.parse_time.observe(seconds)
+            self.pages_parsed += 1
+            self.items_parsed += items
+            self.selectors[selector] += 1
+
+    def record_discarded(self, pages):
+        """Count pages fetched ahead past the end of pagination and never used"""
+        with self.lock:
+            self.pages_discarded += pages
+
+    def summary(self):
+        finished_at = datetime.now()
+        with self.lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "finished_at": finished_at.isoformat(),
+                "duration_seconds": round(
+                    (finished_at - self.started_at).total_seconds(), 3
+                ),
+                "hosts": {
+                    name: {
+                        **{k: v for k, v in host.items() if k != "latency"},
+                        "status_codes": dict(host["status_codes"]),
+                        "latency_seconds": host["latency"].to_dict(),
+                    }
+                    for name, host in self.hosts.items()
+                },
+                "parse": {
+                    "pages": self.pages_parsed,
+                    "items": self.items_parsed,
+                    "discarded_pages": self.pages_discarded,
+                    "seconds": self.parse_time.to_dict(),
+                },
+                "selectors": dict(self.selectors.most_common()),
+            }
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2, ensure_ascii=False)
+
+    def write_prometheus(self, path):
+        """Write a node_exporter textfile-collector file (atomic rename)"""
+        lines = []
+
+        def histogram(name, hist, labels=""):
+            sep = "," if labels else ""
+            for le, count in hist.cumulative():
+                lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {count}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {hist.sum}")
+            lines.append(f"{name}_count{suffix} {hist.count}")
+
+        with self.lock:
+            counters = (
+                ("cropo_fetch_requests_total", "requests", "HTTP requests sent"),
+                ("cropo_fetch_retries_total", "retries", "Retried requests"),
+                ("cropo_fetch_errors_total", "errors", "Failed requests"),
+                ("cropo_fetch_bytes_total", "bytes", "Bytes downloaded or read from cache"),
+                ("cropo_fetch_cache_hits_total", "cache_hits", "Pages served from cache"),
+            )
+            for name, key, help_text in counters:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for host_name, host in self.hosts.items():
+                    lines.append(f'{name}{{host="{_prom_label(host_name)}"}} {host[key]}')
+
+            lines.append("# HELP cropo_fetch_latency_seconds HTTP request latency")
+            lines.append("# TYPE cropo_fetch_latency_seconds histogram")
+            for host_name, host in self.hosts.items():
+                histogram(
+                    "cropo_fetch_latency_seconds",
+                    host["latency"],
+                    f'host="{_prom_label(host_name)}"',
+                )
+
+            lines.append("# HELP cropo_parse_seconds Time spent parsing one page")
+            lines.append("# TYPE cropo_parse_seconds histogram")
+            histogram("cropo_parse_seconds", self.parse_time)
+
+            lines.append(
+                "# HELP cropo_parse_discarded_pages_total Pages fetched past the end of pagination"
+            )
+            lines.append("# TYPE cropo_parse_discarded_pages_total counter")
+            lines.append(f"cropo_parse_discarded_pages_total {self.pages_discarded}")
+
+            lines.append("# HELP cropo_selector_hits_total Pages matched per selector")
+            lines.append("# TYPE cropo_selector_hits_total counter")
+            for selector, hits in self.selectors.items():
+                lines.append(
+                    f'cropo_selector_hits_total{{selector="{_prom_label(selector)}"}} {hits}'
+                )
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+
+# Per-process scraper used by the parse workers (see _init_parse_worker)
+_worker_scraper = None
+
+
+def _init_parse_worker():
+    global _worker_scraper
+    _worker_scraper = FrenchMABScraper()
+
+
+def _parse_listing_page(content, base_url):
+    """Parse one raw page in a worker process.
+
+    Returns (rows, has_next, parse_seconds, selector) where rows are tuples
+    ordered as LISTING_FIELDS, so only values cross the process boundary.
+    """
+    start = time.perf_counter()
+    soup = BeautifulSoup(content, "html.parser")
+    items = _worker_scraper.extract_fusacq_listings(soup, base_url)
+    rows = [tuple(item[field] for field in LISTING_FIELDS) for item in items]
+    has_next = bool(items) and page_has_next(soup)
+    return rows, has_next, time.perf_counter() - start, _worker_scraper.last_selector
+
+
+class FrenchMABScraper:
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self.metrics = CrawlMetrics()
+        self.last_selector = None
         self.session = requests.Session()
         self.session.headers.update(
             {
@@ -37,17 +371,59 @@ class FrenchMABScraper:
     def safe_request(self, url, max_retries=3):
         """Safe request with retries and delays"""
         for attempt in range(max_retries):
+            start = time.perf_counter()
+            resp = None
             try:
                 resp = self.session.get(url, timeout=15)
                 resp.raise_for_status()
+                self.metrics.record_fetch(
+                    url,
+                    time.perf_counter() - start,
+                    status=resp.status_code,
+                    size=len(resp.content),
+                    retry=attempt > 0,
+                )
                 time.sleep(1 + attempt * 0.5)
                 return resp
             except Exception as e:
+                self.metrics.record_fetch(
+                    url,
+                    time.perf_counter() - start,
+                    status=resp.status_code if resp is not None else None,
+                    size=len(resp.content) if resp is not None else 0,
+                    retry=attempt > 0,
+                    error=True,
+                )
                 logger.warning(f"Attempt {attempt + 1} failed for {url}: {e}")
                 if attempt == max_retries - 1:
                     return None
         return None
 
+    def fetch_page(self, url):
+        """Fetch raw page bytes, going through the on-disk cache if enabled.
+
+        Returns (content, from_cache); content is None when the request failed.
+        """
+        cache_path = None
+        if self.cache_dir:
+            digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+            cache_path = os.path.join(self.cache_dir, f"{digest}.html")
+            if os.path.exists(cache_path):
+                with open(cache_path, "rb") as f:
+                    content = f.read()
+                self.metrics.record_cache_hit(url, len(content))
+                return content, True
+
+        resp = self.safe_request(url)
+        if not resp:
+            return None, False
+
+        if cache_path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(cache_path, "wb") as f:
+                f.write(resp.content)
+        return resp.content, False
+
     def extract_fusacq_listings(self, soup, base_url):
         """Extract Fusacq listing items"""
         items = []
@@ -63,16 +439,20 @@ class FrenchMABScraper:
         ]
 
         elements = []
+        self.last_selector = NO_SELECTOR
         for selector in selectors:
             elements = soup.select(selector)
             if elements:
                 logger.info(f"Found {len(elements)} items with selector: {selector}")
+                self.last_selector = selector
                 break
 
         if not elements:
             logger.warning("No items found - trying fallback selectors")
             # Fallback: any link containers
             elements = soup.select("a[href][title], div a[href]")
+            if elements:
+                self.last_selector = FALLBACK_SELECTOR
 
         for el in elements[:50]:  # Limit per page
             try:
@@ -138,23 +518,22 @@ class FrenchMABScraper:
         """✅ YES - Handles ALL pages until end (page 1 → page 6 → stops)"""
         all_items = []
         page = 1
-        max_pages = 50  # Safety limit
 
-        while page <= max_pages:
-            # Handles your exact URL pattern: ?params&page=1, ?params&page=2...
-            if "?" in base_url:
-                url = f"{base_url}&page={page}"
-            else:
-                url = f"{base_url}?page={page}"
+        while page <= MAX_PAGES:
+            url = page_url(base_url, page)
 
             logger.info(f"Scraping page {page}: {url}")
-            resp = self.safe_request(url)
-            if not resp:
+            content, from_cache = self.fetch_page(url)
+            if content is None:
                 logger.info("No response - end of pagination")
                 break
 
-            soup = BeautifulSoup(resp.content, "html.parser")
+            start = time.perf_counter()
+            soup = BeautifulSoup(content, "html.parser")
             items = self.extract_fusacq_listings(soup, base_url)
+            self.metrics.record_parse(
+                time.perf_counter() - start, self.last_selector, len(items)
+            )
 
             if not items:  # Empty page = END
                 logger.info(f"Page {page} empty - stopping")
@@ -163,62 +542,139 @@ class FrenchMABScraper:
             all_items.extend(items)
             logger.info(f"Page {page}: {len(items)} items (total: {len(all_items)})")
 
-            # Check for next page indicators
-            next_btn = soup.select_one(
-                'a.next, .pagination-next, [rel="next"], .suivant'
-            )
-            pagination_info = soup.select_one(".pagination-info, .page-info")
-
-            # Stop conditions
-            if not next_btn or "disabled" in str(next_btn.get("class", [])):
-                logger.info("No next button - end of pagination")
-                break
-
-            if "dernière" in str(soup).lower() or "last" in str(soup).lower():
-                logger.info("Last page indicator found")
+            if not page_has_next(soup):
                 break
 
             page += 1
-            time.sleep(2)  # Polite delay
+            if not from_cache:
+                time.sleep(2)  # Polite delay
 
         return all_items
 
+    def crawl_pipeline(self, categories, workers=None, fetchers=4, queue_size=16):
+        """Crawl categories with fetching and parsing decoupled.
+
+        Fetcher threads (one source URL at a time each) push raw page bytes
+        into a bounded queue; a process pool parses them, so BeautifulSoup
+        work never blocks the next download and uses all cores. Pages are
+        fetched ahead of the parse results, and whatever comes after the
+        last page of a source is discarded when results are assembled; parse
+        metrics are recorded then, for the kept pages only.
+        """
+        page_queue = queue.Queue(maxsize=queue_size)
+        in_flight = threading.BoundedSemaphore(queue_size)
+        lock = threading.Lock()
+        stop_at = {}  # base_url -> first page known to end pagination
+        pages = {}  # base_url -> {page: (rows, has_next, (seconds, selector) or None)}
+        done = object()
+
+        def mark_stop(base_url, page):
+            with lock:
+                if page < stop_at.get(base_url, MAX_PAGES + 1):
+                    stop_at[base_url] = page
+
+        def fetch_source(base_url):
+            for page in range(1, MAX_PAGES + 1):
+                with lock:
+                    if stop_at.get(base_url, MAX_PAGES + 1) < page:
+                        return
+                url = page_url(base_url, page)
+                logger.info(f"Fetching page {page}: {url}")
+                content, from_cache = self.fetch_page(url)
+                if content is None:
+                    logger.info("No response - end of pagination")
+                    with lock:
+                        pages[base_url][page] = ([], False, None)
+                    mark_stop(base_url, page)
+                    return
+                page_queue.put((base_url, page, content))
+                if not from_cache:
+                    time.sleep(2)  # Polite delay
+
+        def fetch_all(base_urls):
+            try:
+                with ThreadPoolExecutor(max_workers=fetchers) as pool:
+                    list(pool.map(fetch_source, base_urls))
+            finally:
+                page_queue.put(done)
+
+        base_urls = []
+        for url_list in categories.values():
+            for url in url_list:
+                if url not in pages:
+                    pages[url] = {}
+                    base_urls.append(url)
+
+        producer = threading.Thread(target=fetch_all, args=(base_urls,), daemon=True)
+        producer.start()
+
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_parse_worker
+        ) as pool:
+
+            def on_parsed(future, base_url, page):
+                in_flight.release()
+                try:
+                    rows, has_next, seconds, selector = future.result()
+                    parse = (seconds, selector)
+                except Exception as e:
+                    logger.warning(f"Parse failed for {base_url} page {page}: {e}")
+                    rows, has_next, parse = [], False, None
+                with lock:
+                    pages[base_url][page] = (rows, has_next, parse)
+                if not has_next:
+                    mark_stop(base_url, page)
+
+            while True:
+                job = page_queue.get()
+                if job is done:
+                    break
+                base_url, page, content = job
+                in_flight.acquire()
+                future = pool.submit(_parse_listing_page, content, base_url)
+                future.add_done_callback(
+                    lambda f, b=base_url, p=page: on_parsed(f, b, p)
+                )
+
+        producer.join()
+
+        measured = set()
+        for category, url_list in categories.items():
+            self.results["sources"][category] = []
+            for url in url_list:
+                items = []
+                kept = 0
+                for page in sorted(pages[url]):
+                    rows, has_next, parse = pages[url][page]
+                    kept += 1
+                    if parse is not None and url not in measured:
+                        self.metrics.record_parse(*parse, len(rows))
+                    items.extend(dict(zip(LISTING_FIELDS, row)) for row in rows)
+                    if not has_next:
+                        break
+                if url not in measured:
+                    measured.add(url)
+                    self.metrics.record_discarded(len(pages[url]) - kept)
+                logger.info(f"{category}: {len(items)} items from {url}")
+                self.results["sources"][category].extend(items)
+                self.results["total_items"] += len(items)
+
+        return self.results
+
     def clean_amount(self, text):
         """Clean € amounts: '5 M€' → 5000000"""
         if not text or text == "N/A":
             return None
-        match = re.search(
-            r"(\d+(?:\.\d+)?)\s*(M?|milliard|million|k?€)", text, re.IGNORECASE
-        )
+        match = AMOUNT_RE.search(text)
         if match:
-            num = float(match.group(1).replace(",", "."))
-            mult = match.group(2).upper() if match.group(2) else ""
-            if mult in ["M", "MILLION"]:
-                num *= 1_000_000
-            elif "MILLIARD" in mult:
-                num *= 1_000_000_000
-            return round(num)
+            num = float(THOUSANDS_SEP_RE.sub("", match.group("num")).replace(",", "."))
+            unit = (match.group("unit") or "").lower()
+            return round(num * UNIT_MULTIPLIERS.get(unit, 1))
         return None
 
     def scrape_all_sources(self, urls):
         """Process all your URLs with full pagination"""
-        categories = {
-            "repreneurs": ["https://www.fusacq.com/annuaire-repreneurs_fr_"],
-            "banks_advisors": [
-                "https://www.fusacq.com/classement/classement-banques-affaires-conseils-fusions-acquisitions?codePays=_fr_"
-            ],
-            "investment_funds": [
-                "https://www.fusacq.com/annuaire-fonds-investissement_fr_"
-            ],
-            "valuations": ["https://www.fusacq.com/base-valorisations_fr_"],
-            "expert_opinions": ["https://www.fusacq.com/avis-experts_fr_"],
-            "cession_actifs": [
-                "https://www.fusacq.com/reprendre-une-entreprise/resultats-cession-actifs_fr_?id_localisation=&reference_mots_cles=&id_secteur_activite=&id_secteur_activite2=&id_secteur_activite3=&id_secteur_activite_fonds=&type_cession=&id_raison_cession=&immo_a_vendre=&prix_cession=&prix_cession_null=1&type_repreneur_personne=&type_repreneur_societe=&apport_demande=&apport_demande_null=1&ca=&ca_null=1&resultat_net=&nb_personnes=&redressement_judiciaire=&prix_cession_min=&prix_cession_max=5000000&ca_min=&ca_max=20000000&apport_min=&apport_max=2000000&nb_personnes_min=&nb_personnes_max=200&date_min=2011&date_max=2021&possession_brevets=&possession_marques=&travail_export=&id_gestionnaire_fonds=&societe_cotee=&type_recherche=5&type_acquereur=&demarche=&tri=&type_partenariat=&recherche_par=motscles"
-            ],
-            # Add your other long URLs here...
-        }
-
-        for category, url_list in categories.items():
+        for category, url_list in FUSACQ_CATEGORIES.items():
             self.results["sources"][category] = []
             for url in url_list:
                 logger.info(f"🔄 Scraping {category}: {url}")
@@ -229,21 +685,235 @@ class FrenchMABScraper:
         return self.results
 
 
+def _normalize_text(series):
+    """Casefold, strip accents and collapse punctuation/whitespace"""
+    return (
+        series.fillna("")
+        .astype(str)
+        .map(
+            lambda text: unicodedata.normalize("NFKD", text)
+            .encode("ascii", "ignore")
+            .decode("ascii")
+        )
+        .str.lower()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def _amounts_column(series):
+    """Vectorized counterpart of FrenchMABScraper.clean_amount"""
+    import pandas as pd
+
+    parts = series.where(series != "N/A").astype("string").str.extract(AMOUNT_RE)
+    num = pd.to_numeric(
+        parts["num"]
+        .str.replace(THOUSANDS_SEP_RE.pattern, "", regex=True)
+        .str.replace(",", ".", regex=False),
+        errors="coerce",
+    )
+    mult = parts["unit"].str.lower().map(UNIT_MULTIPLIERS).fillna(1)
+    return (num * mult).round().astype("Int64")
+
+
+def _dates_column(series):
+    """Parse "12/03/2021", "2021-03-12" and "12 mars 2021" into ISO dates"""
+    import pandas as pd
+
+    text = series.astype("string").str.lower()
+    numeric = text.str.extract(NUMERIC_DATE_RE)
+    words = text.str.extract(TEXT_DATE_RE)
+    parts = pd.DataFrame(
+        {
+            "year": numeric["year"]
+            .fillna(numeric["iso_year"])
+            .fillna(words["year"]),
+            "month": numeric["month"]
+            .fillna(numeric["iso_month"])
+            .fillna(words["month"].map(FRENCH_MONTHS).astype("string")),
+            "day": numeric["day"]
+            .fillna(numeric["iso_day"])
+            # "mars 2020" has no day: default to the 1st
+            .fillna(words["day"].fillna("1").where(words["month"].notna())),
+        }
+    ).apply(pd.to_numeric, errors="coerce").astype("float64")
+    dates = pd.to_datetime(parts, errors="coerce")
+    return dates.dt.strftime("%Y-%m-%d").astype(object).where(dates.notna(), None)
+
+
+def normalize_listings(results):
+    """Normalize every listing of a crawl in one vectorized pass.
+
+    Flattens results["sources"] into a DataFrame (one row per listing, with
+    its category) and adds ca_clean / price_clean, date_clean,
+    location_clean, department and a dedup_key built from the normalized
+    title, location, price and url. Listings with none of these get no
+    dedup_key (NA) and are never merged.
+    """
+    import pandas as pd
+
+    frames = [
+        pd.DataFrame(items).assign(category=category)
+        for category, items in results["sources"].items()
+        if items
+    ]
+    if not frames:
+        frames = [pd.DataFrame(columns=[*LISTING_FIELDS, "category"], dtype=object)]
+    df = pd.concat(frames, ignore_index=True)
+    for field in LISTING_FIELDS:
+        if field not in df:
+            df[field] = None
+
+    df["ca_clean"] = _amounts_column(df["ca"])
+    df["price_clean"] = _amounts_column(df["price"])
+    df["date_clean"] = _dates_column(df["date"])
+
+    location = (
+        df["location"]
+        .where(df["location"] != "N/A")
+        .astype("string")
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+    dept = location.str.lower().str.extract(DEPARTMENT_RE)
+    df["department"] = dept["dept"].fillna(dept["postal"]).str.upper()
+    df["location_clean"] = (
+        location.str.replace(r"\(\s*\w+\s*\)|\b\d{5}\b", "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip(" ,-")
+        .replace("", pd.NA)
+    )
+
+    title = _normalize_text(df["title"].where(~df["title"].isin(["N/A", ""])))
+    url = (
+        df["url"]
+        .where(~df["url"].isin(["N/A", ""]))
+        .astype("string")
+        .str.strip()
+        .str.lower()
+        .str.replace(r"#.*$", "", regex=True)
+        .str.rstrip("/")
+        .fillna("")
+    )
+    parts = [
+        title,
+        _normalize_text(df["location_clean"].astype(object)),
+        df["price_clean"].astype("string").fillna(""),
+        url,
+    ]
+    key = parts[0]
+    for part in parts[1:]:
+        key = key + "|" + part
+    has_content = pd.concat([part != "" for part in parts], axis=1).any(axis=1)
+    df["dedup_key"] = key.astype("string").where(has_content)
+    return df
+
+
+def dedupe_listings(df):
+    """Merge duplicate listings across sources by dedup_key.
+
+    Keeps the first occurrence of each listing and records every category
+    it was found in. Listings without a dedup_key are kept as they are.
+    """
+    import pandas as pd
+
+    keyed = df["dedup_key"].notna()
+    categories = df[keyed].groupby("dedup_key", sort=False)["category"].agg(
+        lambda values: sorted(set(values))
+    )
+    unique = df[keyed].drop_duplicates("dedup_key").drop(columns="category")
+    unique = unique.assign(categories=unique["dedup_key"].map(categories))
+    unkeyed = df[~keyed]
+    unkeyed = unkeyed.drop(columns="category").assign(
+        categories=unkeyed["category"].map(lambda category: [category])
+    )
+    return pd.concat([unique, unkeyed]).sort_index().reset_index(drop=True)
+
+
+def listings_to_records(df):
+    """DataFrame → JSON-serializable list of dicts (NaN/NA become None)"""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
 # Quick test - just your cession-actifs example
 if __name__ == "__main__":
-    scraper = FrenchMABScraper()
+    parser = argparse.ArgumentParser(description="Fusacq M&A listings scraper")
+    parser.add_argument(
+        "--all", action="store_true", help="crawl every category, not just the test URL"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="parse pages in a pool of N processes (0 = sequential fetch/parse loop)",
+    )
+    parser.add_argument("--fetchers", type=int, default=4, help="concurrent fetchers")
+    parser.add_argument("--cache-dir", help="store raw pages here and re-parse them")
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="normalize amounts/dates/locations and merge duplicate listings",
+    )
+    parser.add_argument(
+        "--prom-textfile",
+        metavar="PATH",
+        help="also write crawl metrics as a Prometheus textfile (*.prom)",
+    )
+    parser.add_argument(
+        "--normalize",
+        metavar="RESULTS_JSON",
+        help="normalize and dedupe a previously saved results file, then exit",
+    )
+    args = parser.parse_args()
+
+    if args.normalize:
+        with open(args.normalize, encoding="utf-8") as f:
+            results = json.load(f)
+        listings = dedupe_listings(normalize_listings(results))
+        results["listings"] = listings_to_records(listings)
+        output_path = f"{os.path.splitext(args.normalize)[0]}_normalized.json"
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+        print(f"✅ {len(listings)} unique listings saved to: {output_path}")
+        raise SystemExit(0)
+
+    scraper = FrenchMABScraper(cache_dir=args.cache_dir)
 
     # Test YOUR specific URL (will scrape ALL 6 pages)
     test_url = "https://www.fusacq.com/reprendre-une-entreprise/resultats-cession-actifs_fr_?id_localisation=&reference_mots_cles=&id_secteur_activite=&id_secteur_activite2=&id_secteur_activite3=&id_secteur_activite_fonds=&type_cession=&id_raison_cession=&immo_a_vendre=&prix_cession=&prix_cession_null=1&type_repreneur_personne=&type_repreneur_societe=&apport_demande=&apport_demande_null=1&ca=&ca_null=1&resultat_net=&nb_personnes=&redressement_judiciaire=&prix_cession_min=&prix_cession_max=5000000&ca_min=&ca_max=20000000&apport_min=&apport_max=2000000&nb_personnes_min=&nb_personnes_max=200&date_min=2011&date_max=2021&possession_brevets=&possession_marques=&travail_export=&id_gestionnaire_fonds=&societe_cotee=&type_recherche=5&type_acquereur=&demarche=&tri=&type_partenariat=&recherche_par=motscles"
 
-    print("🚀 Scraping ALL pages of cession-actifs...")
-    items = scraper.handle_fusacq_pagination(test_url)
-
-    scraper.results["sources"]["test_cession_actifs"] = items
-    scraper.results["total_items"] = len(items)
+    if args.all:
+        categories = FUSACQ_CATEGORIES
+        output_path = "fusacq_complete.json"
+    else:
+        categories = {"test_cession_actifs": [test_url]}
+        output_path = "cession_actifs_complete.json"
 
-    with open("cession_actifs_complete.json", "w", encoding="utf-8") as f:
+    print("🚀 Scraping ALL pages of cession-actifs...")
+    if args.workers:
+        scraper.crawl_pipeline(
+            categories, workers=args.workers, fetchers=args.fetchers
+        )
+    elif args.all:
+        scraper.scrape_all_sources(None)
+    else:
+        items = scraper.handle_fusacq_pagination(test_url)
+        scraper.results["sources"]["test_cession_actifs"] = items
+        scraper.results["total_items"] = len(items)
+
+    if args.dedupe:
+        listings = dedupe_listings(normalize_listings(scraper.results))
+        scraper.results["listings"] = listings_to_records(listings)
+        print(f"🧹 {len(listings)} unique listings after deduplication")
+
+    with open(output_path, "w", encoding="utf-8") as f:
         json.dump(scraper.results, f, indent=2, ensure_ascii=False)
 
-    print(f"\n✅ COMPLETE! Scraped {len(items)} deals across ALL pages!")
-    print(f"💾 Saved to: cession_actifs_complete.json")
+    metrics_path = f"{os.path.splitext(output_path)[0]}_metrics.json"
+    scraper.metrics.write_json(metrics_path)
+    if args.prom_textfile:
+        scraper.metrics.write_prometheus(args.prom_textfile)
+
+    print(f"\n✅ COMPLETE! Scraped {scraper.results['total_items']} deals across ALL pages!")
+    print(f"💾 Saved to: {output_path}")
+    print(f"📊 Metrics saved to: {metrics_path}")
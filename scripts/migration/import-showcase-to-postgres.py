@@ -3,16 +3,34 @@
 # Imports showcase website data from Convex export JSON files into PostgreSQL
 # Handles: team_members, blog_posts, forum_categories, job_offers
 # Excludes deprecated fields: quote, education
+#
+# Default mode runs one `psql -c` per row through docker exec, with the
+# statements rendered from the declarative TABLES mappings.
+# --bulk mode streams each documents.jsonl into a temp staging table with
+# COPY over a single direct connection (psycopg2, DATABASE_URL), then merges
+# every table with one set-based INSERT ... ON CONFLICT, all in one transaction.
+# --parallel mode imports the tables concurrently over pooled connections with
+# prepared, batched upserts, writing rejected rows to per-table error files.
+# --state enables incremental sync: documents whose content hash is unchanged
+# since the last import are skipped, and checkpoints are saved as batches
+# commit so an interrupted run resumes where it stopped. Changing a table's
+# mapping in TABLES invalidates its checkpoint, so every row is rewritten.
 
+import argparse
+import hashlib
 import json
 import subprocess
 import os
+import sys
+import threading
+import time
 from datetime import datetime
 
 BACKUP_DIR = "backups/convex_2026-01-22/extracted"
 DB_CONTAINER = "alecia-postgres"
 DB_USER = "alecia"
 DB_NAME = "alecia"
+DATABASE_URL = os.getenv("DATABASE_URL")
 
 def escape_sql_string(s):
     """Escape a string for SQL."""
@@ -21,302 +39,732 @@ def escape_sql_string(s):
     # Replace single quotes with two single quotes
     return s.replace("'", "''")
 
-def escape_sql_array(arr):
-    """Convert a list to a PostgreSQL text array."""
-    if not arr:
-        return "ARRAY[]::text[]"
-    # Escape each element and wrap in single quotes
-    escaped = [f"'{escape_sql_string(str(x))}'" for x in arr]
-    return f"ARRAY[{', '.join(escaped)}]::text[]"
-
 def execute_sql(sql):
-    """Execute SQL via docker exec."""
+    """Execute SQL via docker exec. Returns the error output, or None on success."""
     cmd = [
         "docker", "exec", DB_CONTAINER,
         "psql", "-U", DB_USER, "-d", DB_NAME,
+        "-v", "ON_ERROR_STOP=1",
         "-c", sql
     ]
     result = subprocess.run(cmd, capture_output=True, text=True)
     if result.returncode != 0:
         print(f"SQL Error: {result.stderr}")
-        return False
-    return True
+        return result.stderr or "psql exited with {}".format(result.returncode)
+    return None
 
-def import_team_members():
-    """Import team members from Convex backup."""
-    print("Importing team members...")
-    file_path = os.path.join(BACKUP_DIR, "team_members/documents.jsonl")
-    
-    if not os.path.exists(file_path):
-        print("  ⚠ File not found: {}".format(file_path))
-        return 0
-    
-    count = 0
-    with open(file_path, 'r') as f:
-        for line in f:
-            if not line.strip():
-                continue
-            
-            data = json.loads(line)
-            slug = data.get('slug')
-            name = data.get('name')
-            
-            if not slug or not name:
-                continue
-            
-            # Skip deprecated fields: quote, passion
-            bio_fr = escape_sql_string(data.get('bioFr', ''))
-            bio_en = escape_sql_string(data.get('bioEn', ''))
-            role = escape_sql_string(data.get('role', ''))
-            linkedin_url = escape_sql_string(data.get('linkedinUrl', ''))
-            email = escape_sql_string(data.get('email', ''))
-            is_active = data.get('isActive', True)
-            display_order = data.get('displayOrder', 0)
-            
-            sectors_expertise = escape_sql_array(data.get('sectorsExpertise', []))
-            transaction_slugs = escape_sql_array(data.get('transactionSlugs', []))
-            
-            sql = f"""
-                INSERT INTO shared.team_members (
-                    slug, name, role, bio_fr, bio_en, linkedin_url, email,
-                    sectors_expertise, transaction_slugs, is_active, display_order, created_at, updated_at
-                )
-                VALUES (
-                    '{slug}',
-                    '{escape_sql_string(name)}',
-                    '{role}',
-                    E'{bio_fr}',
-                    E'{bio_en}',
-                    '{linkedin_url}',
-                    '{email}',
-                    {sectors_expertise},
-                    {transaction_slugs},
-                    {str(is_active).lower()},
-                    {display_order},
-                    NOW(),
-                    NOW()
-                )
-                ON CONFLICT (slug) DO UPDATE SET
-                    name = EXCLUDED.name,
-                    role = EXCLUDED.role,
-                    bio_fr = EXCLUDED.bio_fr,
-                    bio_en = EXCLUDED.bio_en,
-                    linkedin_url = EXCLUDED.linkedin_url,
-                    email = EXCLUDED.email,
-                    sectors_expertise = EXCLUDED.sectors_expertise,
-                    transaction_slugs = EXCLUDED.transaction_slugs,
-                    is_active = EXCLUDED.is_active,
-                    display_order = EXCLUDED.display_order,
-                    updated_at = NOW();
-            """
-            
-            if execute_sql(sql):
-                count += 1
-    
-    print(f"✓ Imported {count} team members")
-    return count
+# ============================================================================
+# Table mappings (shared by every mode)
+# ============================================================================
+#
+# Each Convex collection is described declaratively: its target table, the
+# source fields that must be present, one (column, parameter type, getter)
+# entry per mapped column, SQL constants, and the upsert behaviour. Adding a
+# collection only needs a new entry in TABLES.
 
-def import_blog_posts():
-    """Import blog posts from Convex backup."""
-    print("Importing blog posts...")
-    file_path = os.path.join(BACKUP_DIR, "blog_posts/documents.jsonl")
-    
-    if not os.path.exists(file_path):
-        print("  ⚠ File not found: {}".format(file_path))
-        return 0
-    
-    count = 0
-    with open(file_path, 'r') as f:
-        for line in f:
-            if not line.strip():
-                continue
-            
-            data = json.loads(line)
-            slug = data.get('slug')
-            title = data.get('title')
-            
-            if not slug or not title:
-                continue
-            
-            content = escape_sql_string(data.get('content', ''))
-            excerpt = escape_sql_string(data.get('excerpt', ''))
-            category = escape_sql_string(data.get('category', ''))
-            cover_image = escape_sql_string(data.get('coverImage', ''))
-            status = data.get('status', 'published')
-            
-            # Convert published_at from milliseconds to bigint (seconds)
-            published_at = data.get('publishedAt')
-            if published_at and published_at != "null":
-                published_at_pg = str(int(published_at / 1000))
-            else:
-                published_at_pg = "NULL"
-            
-            # Convert created_at from milliseconds to bigint (seconds)
-            created_at = data.get('_creationTime')
-            if created_at:
-                created_at_pg = str(int(created_at / 1000))
-            else:
-                created_at_pg = str(int(datetime.now().timestamp()))
-            
-            seo_title = escape_sql_string(data.get('seoTitle', ''))
-            seo_description = escape_sql_string(data.get('seoDescription', ''))
-            
-            sql = f"""
-                INSERT INTO shared.blog_posts (
-                    status, title, slug, content, excerpt, featured_image, category,
-                    published_at, seo, tags, created_at
-                )
-                VALUES (
-                    '{status}',
-                    '{escape_sql_string(title)}',
-                    '{slug}',
-                    E'{content}',
-                    E'{excerpt}',
-                    '{cover_image}',
-                    '{category}',
-                    {published_at_pg},
-                    '{{"title": "{seo_title}", "description": "{seo_description}"}}'::jsonb,
-                    '{{}}'::text[],
-                    {created_at_pg}
-                )
-                ON CONFLICT (slug) DO UPDATE SET
-                    title = EXCLUDED.title,
-                    content = EXCLUDED.content,
-                    excerpt = EXCLUDED.excerpt,
-                    featured_image = EXCLUDED.featured_image,
-                    category = EXCLUDED.category,
-                    published_at = EXCLUDED.published_at,
-                    seo = EXCLUDED.seo,
-                    tags = EXCLUDED.tags;
-            """
-            
-            if execute_sql(sql):
-                count += 1
-    
-    print(f"✓ Imported {count} blog posts")
-    return count
+def field(key, default=''):
+    """Getter for a plain field; missing or null values become `default`."""
+    return lambda data: data.get(key) or default
 
-def import_forum_categories():
-    """Import forum categories from Convex backup."""
-    print("Importing forum categories...")
-    file_path = os.path.join(BACKUP_DIR, "forum_categories/documents.jsonl")
-    
+def flag(key, default):
+    return lambda data: data.get(key, default)
+
+def integer(key):
+    return lambda data: int(data.get(key) or 0)
+
+def text_list(key):
+    return lambda data: [str(x) for x in data.get(key) or []]
+
+def millis_to_seconds(key, default_now=False):
+    """Convert a Convex millisecond timestamp to bigint seconds."""
+    def get(data):
+        value = data.get(key)
+        if value and value != "null":
+            return int(value / 1000)
+        return int(datetime.now().timestamp()) if default_now else None
+    return get
+
+def blog_seo(data):
+    return {
+        "title": data.get('seoTitle') or '',
+        "description": data.get('seoDescription') or '',
+    }
+
+TABLES = [
+    {
+        "source": "team_members",
+        "target": "shared.team_members",
+        "label": "team members",
+        "required": ["slug", "name"],
+        # Skip deprecated fields: quote, passion
+        "columns": [
+            ("slug", "text", field('slug')),
+            ("name", "text", field('name')),
+            ("role", "text", field('role')),
+            ("bio_fr", "text", field('bioFr')),
+            ("bio_en", "text", field('bioEn')),
+            ("linkedin_url", "text", field('linkedinUrl')),
+            ("email", "text", field('email')),
+            ("sectors_expertise", "text[]", text_list('sectorsExpertise')),
+            ("transaction_slugs", "text[]", text_list('transactionSlugs')),
+            ("is_active", "boolean", flag('isActive', True)),
+            ("display_order", "integer", integer('displayOrder')),
+        ],
+        "constants": {"created_at": "NOW()", "updated_at": "NOW()"},
+        "conflict": "slug",
+        "update": [
+            "name", "role", "bio_fr", "bio_en", "linkedin_url", "email",
+            "sectors_expertise", "transaction_slugs", "is_active",
+            "display_order", "updated_at",
+        ],
+    },
+    {
+        "source": "blog_posts",
+        "target": "shared.blog_posts",
+        "label": "blog posts",
+        "required": ["slug", "title"],
+        "columns": [
+            ("status", "text", field('status', 'published')),
+            ("title", "text", field('title')),
+            ("slug", "text", field('slug')),
+            ("content", "text", field('content')),
+            ("excerpt", "text", field('excerpt')),
+            ("featured_image", "text", field('coverImage')),
+            ("category", "text", field('category')),
+            ("published_at", "bigint", millis_to_seconds('publishedAt')),
+            ("seo", "jsonb", blog_seo),
+            ("created_at", "bigint", millis_to_seconds('_creationTime', default_now=True)),
+        ],
+        "constants": {"tags": "'{}'::text[]"},
+        "conflict": "slug",
+        "update": [
+            "title", "content", "excerpt", "featured_image", "category",
+            "published_at", "seo", "tags",
+        ],
+    },
+    {
+        "source": "forum_categories",
+        "target": "shared.forum_categories",
+        "label": "forum categories",
+        "required": ["name"],
+        "columns": [
+            ("name", "text", field('name')),
+            ("description", "text", field('description')),
+            ("is_private", "boolean", flag('isPrivate', False)),
+            ("order", "integer", integer('order')),
+        ],
+        "constants": {"created_at": "NOW()"},
+        "conflict": None,
+        "update": [],
+    },
+    {
+        "source": "job_offers",
+        "target": "shared.job_offers",
+        "label": "job offers",
+        "required": ["slug", "title"],
+        "columns": [
+            ("slug", "text", field('slug')),
+            ("title", "text", field('title')),
+            ("type", "text", field('type')),
+            ("location", "text", field('location')),
+            ("description", "text", field('description')),
+            ("requirements", "text[]", text_list('requirements')),
+            ("contact_email", "text", field('contactEmail')),
+            ("pdf_url", "text", field('pdfUrl')),
+            ("is_published", "boolean", flag('isPublished', False)),
+            ("display_order", "integer", integer('displayOrder')),
+        ],
+        "constants": {"created_at": "NOW()", "updated_at": "NOW()"},
+        "conflict": "slug",
+        "update": [
+            "title", "type", "location", "description", "requirements",
+            "contact_email", "pdf_url", "is_published", "display_order",
+            "updated_at",
+        ],
+    },
+]
+
+def quote_ident(name):
+    return '"{}"'.format(name)
+
+def read_documents(table):
+    """Yield (line number, document) for every record of a Convex table export."""
+    file_path = os.path.join(BACKUP_DIR, table["source"], "documents.jsonl")
     if not os.path.exists(file_path):
         print("  ⚠ File not found: {}".format(file_path))
-        return 0
-    
-    count = 0
+        return
     with open(file_path, 'r') as f:
-        for line in f:
-            if not line.strip():
-                continue
-            
-            data = json.loads(line)
-            name = data.get('name')
-            
-            if not name:
+        for line_no, line in enumerate(f, 1):
+            if line.strip():
+                yield line_no, json.loads(line)
+
+def map_document(table, data):
+    """Map a Convex document to a row tuple (None when required fields are missing)."""
+    if any(not data.get(key) for key in table["required"]):
+        return None
+    return tuple(get(data) for _, _, get in table["columns"])
+
+class ErrorLog:
+    """Row-level error file (<errors dir>/<source>.errors.jsonl), opened on first error."""
+
+    def __init__(self, errors_dir, table):
+        self.path = (os.path.join(errors_dir, "{}.errors.jsonl".format(table["source"]))
+                     if errors_dir else None)
+        self.file = None
+        self.count = 0
+
+    def write(self, line_no, data, error):
+        self.count += 1
+        if not self.path:
+            return
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, 'w')
+        record = {"line": line_no, "_id": data.get('_id'), "error": str(error).strip(),
+                  "document": data}
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+def mapping_fingerprint(table):
+    """Hash of everything in a TABLES entry that shapes the target rows."""
+    spec = {
+        "target": table["target"],
+        "required": table["required"],
+        "columns": [[column, pg_type] for column, pg_type, _ in table["columns"]],
+        "constants": table["constants"],
+        "conflict": table["conflict"],
+        "update": table["update"],
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+class SyncState:
+    """Incremental sync checkpoints, persisted as JSON.
+
+    Per Convex table: the fingerprint of its mapping, the content hash of
+    every imported document (by _id) and the highest _creationTime imported.
+    A checkpoint taken with a different mapping is dropped. Saved after
+    commits (at most every SAVE_INTERVAL seconds, and at the end), so a failed
+    run resumes from the last committed batch.
+    """
+
+    SAVE_INTERVAL = 5  # seconds
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.last_saved = 0
+        self.tables = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.tables = json.load(f).get("tables", {})
+
+    def table(self, table):
+        mapping = mapping_fingerprint(table)
+        with self.lock:
+            state = self.tables.setdefault(table["source"], {"hashes": {}, "high_water": 0})
+            if state.get("mapping") != mapping:
+                if state["hashes"]:
+                    print("  Mapping of {} changed: re-importing every row".format(
+                        table["source"]))
+                state.update(hashes={}, high_water=0, mapping=mapping)
+            return state
+
+    def commit(self, source, keys):
+        """Record committed documents, given as (_id, content hash, _creationTime)."""
+        with self.lock:
+            state = self.tables.setdefault(source, {"hashes": {}, "high_water": 0})
+            for doc_id, digest, created in keys:
+                if doc_id is None:
+                    continue
+                state["hashes"][doc_id] = digest
+                state["high_water"] = max(state["high_water"], created)
+            if time.monotonic() - self.last_saved >= self.SAVE_INTERVAL:
+                self._save()
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        tmp_path = "{}.tmp".format(self.path)
+        with open(tmp_path, 'w') as f:
+            json.dump({"updated_at": datetime.now().isoformat(), "tables": self.tables}, f)
+        os.replace(tmp_path, self.path)
+        self.last_saved = time.monotonic()
+
+class TableSync:
+    """Decides, per document, whether a table import needs to touch it."""
+
+    def __init__(self, state, table, since_checkpoint=False):
+        checkpoint = state.table(table)
+        self.hashes = checkpoint["hashes"]
+        self.high_water = checkpoint["high_water"]
+        self.since_checkpoint = since_checkpoint
+        self.seen = set()
+        self.new = self.changed = self.unchanged = 0
+
+    def check(self, data, row):
+        """Return the (_id, hash, _creationTime) key to import, or None to skip.
+
+        The hash covers the mapped row as well, so a fixed getter rewrites the
+        rows it now maps differently.
+        """
+        doc_id = data.get('_id')
+        created = data.get('_creationTime') or 0
+        if self.since_checkpoint and doc_id and created <= self.high_water:
+            self.unchanged += 1
+            return None
+        digest = hashlib.sha1(
+            json.dumps([data, row], sort_keys=True, ensure_ascii=False,
+                       default=str).encode('utf-8')
+        ).hexdigest()
+        if doc_id:
+            self.seen.add(doc_id)
+        previous = self.hashes.get(doc_id)
+        if previous == digest:
+            self.unchanged += 1
+            return None
+        if previous is None:
+            self.new += 1
+        else:
+            self.changed += 1
+        return doc_id, digest, created
+
+    def summary(self):
+        text = f"{self.new} new, {self.changed} changed, {self.unchanged} unchanged, "
+        if not self.since_checkpoint:
+            missing = len(self.hashes.keys() - self.seen)
+            if missing:
+                text += f"{missing} missing from export, "
+        return text
+
+def mapped_rows(table, errors, sync=None):
+    """Yield (line number, document, row, sync key) for every document to import."""
+    for line_no, data in read_documents(table):
+        try:
+            row = map_document(table, data)
+        except Exception as e:
+            errors.write(line_no, data, e)
+            continue
+        if row is None:
+            continue
+        key = None
+        if sync:
+            key = sync.check(data, row)
+            if key is None:
                 continue
-            
-            description = escape_sql_string(data.get('description', ''))
-            is_private = data.get('isPrivate', False)
-            order = data.get('order', 0)
-            
-            sql = f"""
-                INSERT INTO shared.forum_categories (
-                    name, description, is_private, "order", created_at
-                )
-                VALUES (
-                    '{escape_sql_string(name)}',
-                    E'{description}',
-                    {str(is_private).lower()},
-                    {order},
-                    NOW()
-                )
-                ON CONFLICT DO NOTHING;
-            """
-            
-            if execute_sql(sql):
+        yield line_no, data, row, key
+
+def upsert_clause(table):
+    if not table["conflict"]:
+        return "ON CONFLICT DO NOTHING"
+    updates = ",\n                ".join(
+        "{0} = EXCLUDED.{0}".format(quote_ident(column)) for column in table["update"])
+    return "ON CONFLICT ({}) DO UPDATE SET\n                {}".format(
+        quote_ident(table["conflict"]), updates)
+
+def insert_columns(table):
+    columns = [column for column, _, _ in table["columns"]] + list(table["constants"])
+    return ", ".join(quote_ident(column) for column in columns)
+
+def report(label, count, elapsed, detail=""):
+    rate = count / elapsed if elapsed > 0 else 0
+    # One write per line: tables report from concurrent threads in --parallel
+    sys.stdout.write(f"✓ Imported {count} {label} ({detail}{rate:,.0f} rows/s)\n")
+
+# ============================================================================
+# Default mode (one psql -c per row through docker exec)
+# ============================================================================
+
+def sql_literal(value, pg_type):
+    """Render a mapped value as a SQL literal of its parameter type."""
+    if value is None:
+        return "NULL"
+    if pg_type == "text[]":
+        if not value:
+            return "ARRAY[]::text[]"
+        return "ARRAY[{}]::text[]".format(", ".join(sql_literal(x, "text") for x in value))
+    if pg_type == "boolean":
+        return "true" if value else "false"
+    if pg_type in ("integer", "bigint"):
+        return str(int(value))
+    if pg_type == "jsonb":
+        value = json.dumps(value, ensure_ascii=False)
+    return "'{}'::{}".format(escape_sql_string(str(value)), pg_type)
+
+def insert_sql(table, row):
+    values = [sql_literal(value, pg_type)
+              for value, (_, pg_type, _) in zip(row, table["columns"])]
+    values += list(table["constants"].values())
+    return "INSERT INTO {} ({}) VALUES ({}) {};".format(
+        table["target"], insert_columns(table), ", ".join(values), upsert_clause(table))
+
+def docker_import(errors_dir=None, state=None, since_checkpoint=False):
+    """Import every table row by row; each psql call commits on its own."""
+    total = 0
+    for table in TABLES:
+        print(f"Importing {table['label']}...")
+        errors = ErrorLog(errors_dir, table)
+        sync = TableSync(state, table, since_checkpoint) if state else None
+        count = 0
+        started = time.perf_counter()
+        try:
+            for line_no, data, row, key in mapped_rows(table, errors, sync):
+                error = execute_sql(insert_sql(table, row))
+                if error:
+                    errors.write(line_no, data, error)
+                    continue
                 count += 1
-    
-    print(f"✓ Imported {count} forum categories")
-    return count
+                if state:
+                    state.commit(table["source"], [key])
+        finally:
+            errors.close()
+            if state:
+                state.save()
+        report(table["label"], count, time.perf_counter() - started,
+               f"{sync.summary() if sync else ''}{errors.count} errors, ")
+        total += count
+    return total
 
-def import_job_offers():
-    """Import job offers from Convex backup."""
-    print("Importing job offers...")
-    file_path = os.path.join(BACKUP_DIR, "job_offers/documents.jsonl")
-    
-    if not os.path.exists(file_path):
-        print("  ⚠ File not found: {}".format(file_path))
-        return 0
-    
+# ============================================================================
+# Bulk mode (COPY into staging tables + set-based merge)
+# ============================================================================
+
+def copy_text_value(value):
+    """Encode a value for COPY ... FROM STDIN (text format)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+class CopyStream:
+    """File-like object producing COPY text lines lazily from an iterator of rows."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = ""
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.buffer += "\t".join(copy_text_value(v) for v in row) + "\n"
+            self.count += 1
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+def merge_sql(table, staging):
+    """Set-based merge from a staging table.
+
+    Arrays are staged as jsonb and expanded here. DISTINCT ON keeps the last
+    export line per key, like the row-by-row upserts did.
+    """
+    selects = []
+    for column, pg_type, _ in table["columns"]:
+        if pg_type == "text[]":
+            selects.append("ARRAY(SELECT jsonb_array_elements_text({}))".format(
+                quote_ident(column)))
+        else:
+            selects.append(quote_ident(column))
+    selects += list(table["constants"].values())
+
+    if table["conflict"]:
+        distinct = "DISTINCT ON ({}) ".format(quote_ident(table["conflict"]))
+        order = "{}, line_no DESC".format(quote_ident(table["conflict"]))
+    else:
+        distinct, order = "", "line_no"
+
+    return f"""
+        INSERT INTO {table["target"]} ({insert_columns(table)})
+        SELECT {distinct}{", ".join(selects)}
+        FROM {staging}
+        ORDER BY {order}
+        {upsert_clause(table)}
+    """
+
+def bulk_import_table(cursor, table, errors, sync=None):
+    """COPY one Convex table into a staging table and merge it.
+
+    Returns (staged, merged, sync keys of the staged documents).
+    """
+    staging = "staging_{}".format(table["source"])
+    columns = [("line_no", "integer")] + [
+        (column, "jsonb" if pg_type == "text[]" else pg_type)
+        for column, pg_type, _ in table["columns"]
+    ]
+    column_defs = ", ".join("{} {}".format(quote_ident(name), pg_type)
+                            for name, pg_type in columns)
+    column_names = ", ".join(quote_ident(name) for name, _ in columns)
+
+    cursor.execute(f"CREATE TEMP TABLE {staging} ({column_defs}) ON COMMIT DROP")
+
+    keys = []
+
+    def rows():
+        for line_no, _, row, key in mapped_rows(table, errors, sync):
+            keys.append(key)
+            yield (line_no,) + row
+
+    stream = CopyStream(rows())
+    cursor.copy_expert(f"COPY {staging} ({column_names}) FROM STDIN", stream)
+    cursor.execute(merge_sql(table, staging))
+    return stream.count, cursor.rowcount, keys
+
+def bulk_import(database_url, dry_run=False, errors_dir=None, state=None,
+                since_checkpoint=False):
+    """Import every showcase table in one transaction over a single connection."""
+    import psycopg2
+
+    conn = psycopg2.connect(database_url)
+    total = 0
+    committed = []
+    started = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            for table in TABLES:
+                print(f"Importing {table['label']}...")
+                errors = ErrorLog(errors_dir, table)
+                sync = TableSync(state, table, since_checkpoint) if state else None
+                table_started = time.perf_counter()
+                try:
+                    staged, merged, keys = bulk_import_table(cursor, table, errors, sync)
+                finally:
+                    errors.close()
+                report(table["label"], merged, time.perf_counter() - table_started,
+                       f"{staged} staged, {sync.summary() if sync else ''}"
+                       f"{errors.count} errors, ")
+                committed.append((table["source"], keys))
+                total += staged
+        if dry_run:
+            conn.rollback()
+            print("Dry run: transaction rolled back")
+        else:
+            conn.commit()
+            if state:
+                for source, keys in committed:
+                    state.commit(source, keys)
+                state.save()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else 0
+    print(f"Bulk import: {total} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    return total
+
+# ============================================================================
+# Parallel mode (prepared, batched statements over pooled connections)
+# ============================================================================
+
+def prepare_sql(table, name):
+    """PREPARE an upsert with typed parameters, so each batch reuses one plan."""
+    types = ", ".join(pg_type for _, pg_type, _ in table["columns"])
+    params = ["${}".format(i) for i in range(1, len(table["columns"]) + 1)]
+    values = ", ".join(params + list(table["constants"].values()))
+    return f"""
+        PREPARE {name} ({types}) AS
+        INSERT INTO {table["target"]} ({insert_columns(table)})
+        VALUES ({values})
+        {upsert_clause(table)}
+    """
+
+def parallel_import_table(pool, table, batch_size, dry_run, errors_dir, state=None,
+                          since_checkpoint=False):
+    """Import one table on its own pooled connection. Returns the imported row count.
+
+    Without a sync state the table is imported in a single transaction; with
+    one, every batch is committed and checkpointed so a rerun can resume.
+    """
+    from psycopg2.extras import Json, execute_batch
+
+    statement = "import_{}".format(table["source"])
+    execute = "EXECUTE {} ({})".format(
+        statement, ", ".join(["%s"] * len(table["columns"])))
+    json_columns = [i for i, (_, pg_type, _) in enumerate(table["columns"])
+                    if pg_type == "jsonb"]
+
+    def params(row):
+        row = list(row)
+        for i in json_columns:
+            row[i] = Json(row[i])
+        return row
+
+    errors = ErrorLog(errors_dir, table)
+    sync = TableSync(state, table, since_checkpoint) if state else None
+    conn = pool.getconn()
     count = 0
-    with open(file_path, 'r') as f:
-        for line in f:
-            if not line.strip():
-                continue
-            
-            data = json.loads(line)
-            slug = data.get('slug')
-            title = data.get('title')
-            
-            if not slug or not title:
-                continue
-            
-            type_val = escape_sql_string(data.get('type', ''))
-            location = escape_sql_string(data.get('location', ''))
-            description = escape_sql_string(data.get('description', ''))
-            contact_email = escape_sql_string(data.get('contactEmail', ''))
-            pdf_url = escape_sql_string(data.get('pdfUrl', ''))
-            is_published = data.get('isPublished', False)
-            display_order = data.get('displayOrder', 0)
-            
-            requirements = escape_sql_array(data.get('requirements', []))
-            
-            sql = f"""
-                INSERT INTO shared.job_offers (
-                    slug, title, type, location, description, requirements,
-                    contact_email, pdf_url, is_published, display_order, created_at, updated_at
-                )
-                VALUES (
-                    '{slug}',
-                    '{escape_sql_string(title)}',
-                    '{type_val}',
-                    '{location}',
-                    E'{description}',
-                    {requirements},
-                    '{contact_email}',
-                    '{pdf_url}',
-                    {str(is_published).lower()},
-                    {display_order},
-                    NOW(),
-                    NOW()
-                )
-                ON CONFLICT (slug) DO UPDATE SET
-                    title = EXCLUDED.title,
-                    type = EXCLUDED.type,
-                    location = EXCLUDED.location,
-                    description = EXCLUDED.description,
-                    requirements = EXCLUDED.requirements,
-                    contact_email = EXCLUDED.contact_email,
-                    pdf_url = EXCLUDED.pdf_url,
-                    is_published = EXCLUDED.is_published,
-                    display_order = EXCLUDED.display_order,
-                    updated_at = NOW();
-            """
-            
-            if execute_sql(sql):
-                count += 1
-    
-    print(f"✓ Imported {count} job offers")
+    started = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(prepare_sql(table, statement))
+
+            def execute_rows(batch):
+                """Return the sync keys of the rows that were written."""
+                # Try the whole batch; on failure replay it row by row so a
+                # single bad record only lands in the error file.
+                cursor.execute("SAVEPOINT batch")
+                try:
+                    execute_batch(cursor, execute, [params(row) for _, _, row, _ in batch],
+                                  page_size=batch_size)
+                    cursor.execute("RELEASE SAVEPOINT batch")
+                    return [key for _, _, _, key in batch]
+                except Exception:
+                    cursor.execute("ROLLBACK TO SAVEPOINT batch")
+                    cursor.execute("RELEASE SAVEPOINT batch")
+                written = []
+                for line_no, data, row, key in batch:
+                    cursor.execute("SAVEPOINT row")
+                    try:
+                        cursor.execute(execute, params(row))
+                        written.append(key)
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO SAVEPOINT row")
+                        errors.write(line_no, data, e)
+                    cursor.execute("RELEASE SAVEPOINT row")
+                return written
+
+            def flush(batch):
+                written = execute_rows(batch)
+                if sync and not dry_run:
+                    conn.commit()
+                    state.commit(table["source"], written)
+                return len(written)
+
+            batch = []
+            for record in mapped_rows(table, errors, sync):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    count += flush(batch)
+                    batch = []
+            if batch:
+                count += flush(batch)
+
+            cursor.execute(f"DEALLOCATE {statement}")
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        errors.close()
+        pool.putconn(conn)
+
+    report(table["label"], count, time.perf_counter() - started,
+           f"{sync.summary() if sync else ''}{errors.count} errors, ")
     return count
 
+def parallel_import(database_url, workers=4, batch_size=500, dry_run=False,
+                    errors_dir=None, state=None, since_checkpoint=False):
+    """Import independent tables concurrently, one pooled connection and transaction each."""
+    from concurrent.futures import ThreadPoolExecutor
+    from psycopg2.pool import ThreadedConnectionPool
+
+    workers = max(1, min(workers, len(TABLES)))
+    pool = ThreadedConnectionPool(1, workers, database_url)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(parallel_import_table, pool, table, batch_size,
+                                dry_run, errors_dir, state, since_checkpoint)
+                for table in TABLES
+            ]
+            total = sum(future.result() for future in futures)
+    finally:
+        pool.closeall()
+        if state and not dry_run:
+            state.save()
+
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else 0
+    print(f"Parallel import: {total} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    if dry_run:
+        print("Dry run: transactions rolled back")
+    return total
+
 def main():
     """Main function."""
+    global BACKUP_DIR
+    parser = argparse.ArgumentParser(
+        description="Import showcase website data from a Convex export into PostgreSQL")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--bulk", action="store_true",
+                      help="COPY + set-based merge over one direct connection")
+    mode.add_argument("--parallel", action="store_true",
+                      help="prepared, batched upserts importing tables concurrently")
+    parser.add_argument("--database-url", default=DATABASE_URL,
+                        help="PostgreSQL URL for --bulk/--parallel (default: $DATABASE_URL)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="concurrent tables/connections for --parallel")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="rows per batch for --parallel")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="run the import, then roll back (--bulk/--parallel)")
+    parser.add_argument("--errors-dir",
+                        help="write rejected rows to <dir>/<table>.errors.jsonl")
+    parser.add_argument("--backup-dir", default=BACKUP_DIR,
+                        help=f"extracted Convex export to import (default: {BACKUP_DIR})")
+    parser.add_argument("--state",
+                        help="sync state file: skip unchanged documents and resume "
+                             "interrupted runs")
+    parser.add_argument("--since-checkpoint", action="store_true",
+                        help="with --state, only consider documents created after the "
+                             "last imported _creationTime (append-only delta; edits to "
+                             "older documents are not picked up)")
+    args = parser.parse_args()
+    BACKUP_DIR = args.backup_dir
+
     print("=== Alecia Showcase Website Import to PostgreSQL ===")
     print("Excluding deprecated fields: quote, education")
     print()
-    
+
+    if args.since_checkpoint and not args.state:
+        print("Error: --since-checkpoint needs --state.")
+        return 1
+
+    state = SyncState(args.state) if args.state else None
+    if args.bulk or args.parallel:
+        if not args.database_url:
+            print("Error: --bulk/--parallel need --database-url or DATABASE_URL.")
+            return 1
+        if args.bulk:
+            bulk_import(args.database_url, dry_run=args.dry_run,
+                        errors_dir=args.errors_dir, state=state,
+                        since_checkpoint=args.since_checkpoint)
+        else:
+            parallel_import(args.database_url, workers=args.workers,
+                            batch_size=args.batch_size, dry_run=args.dry_run,
+                            errors_dir=args.errors_dir, state=state,
+                            since_checkpoint=args.since_checkpoint)
+        print()
+        print("=== Showcase website import complete ===")
+        return 0
+
+    if args.dry_run:
+        print("Error: --dry-run needs --bulk or --parallel.")
+        return 1
+
     # Check if database container is running
     result = subprocess.run(
         ["docker", "ps", "--filter", f"name={DB_CONTAINER}", "--format", "{{.Names}}"],
@@ -328,11 +776,9 @@ def main():
         return 1
     
     # Import in order (no FK dependencies between these tables)
-    import_team_members()
-    import_blog_posts()
-    import_forum_categories()
-    import_job_offers()
-    
+    docker_import(errors_dir=args.errors_dir, state=state,
+                  since_checkpoint=args.since_checkpoint)
+
     print()
     print("=== Showcase website import complete ===")
     return 0